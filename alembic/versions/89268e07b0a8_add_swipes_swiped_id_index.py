@@ -0,0 +1,28 @@
+"""add swipes swiped_id index
+
+Revision ID: 89268e07b0a8
+Revises: b29d63d4e525
+Create Date: 2026-10-18 14:21:37.418205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '89268e07b0a8'
+down_revision: Union[str, None] = 'b29d63d4e525'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_swipes_swiped_id_created_at', 'swipes', ['swiped_id', 'created_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_swipes_swiped_id_created_at', table_name='swipes')
@@ -0,0 +1,32 @@
+"""add match user indexes
+
+Revision ID: b29d63d4e525
+Revises: caeedc99ba6f
+Create Date: 2026-10-18 13:05:52.907146
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b29d63d4e525'
+down_revision: Union[str, None] = 'caeedc99ba6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_matches_user1_id_created_at', 'matches', ['user1_id', 'created_at'], unique=False
+    )
+    op.create_index(
+        'ix_matches_user2_id_created_at', 'matches', ['user2_id', 'created_at'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_matches_user2_id_created_at', table_name='matches')
+    op.drop_index('ix_matches_user1_id_created_at', table_name='matches')
@@ -0,0 +1,86 @@
+"""unique swipes and match pairs
+
+Revision ID: caeedc99ba6f
+Revises: d55c970e6cd9
+Create Date: 2026-10-18 11:40:06.552913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'caeedc99ba6f'
+down_revision: Union[str, None] = 'd55c970e6cd9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+
+    # Keep only the earliest swipe per (swiper, swiped) pair
+    connection.execute(
+        sa.text(
+            "DELETE s1 FROM swipes s1 "
+            "JOIN swipes s2 ON s1.swiper_id = s2.swiper_id "
+            "AND s1.swiped_id = s2.swiped_id "
+            "AND (s1.created_at > s2.created_at "
+            "OR (s1.created_at = s2.created_at AND s1.id > s2.id))"
+        )
+    )
+    op.create_unique_constraint(
+        'uq_swipes_swiper_swiped', 'swipes', ['swiper_id', 'swiped_id']
+    )
+
+    # Store match pairs canonically (user1_id < user2_id)
+    rows = connection.execute(
+        sa.text(
+            "SELECT id, user1_id, user2_id FROM matches "
+            "WHERE user1_id > user2_id"
+        )
+    ).fetchall()
+    if rows:
+        connection.execute(
+            sa.text(
+                "UPDATE matches SET user1_id = :user1_id, user2_id = :user2_id "
+                "WHERE id = :id"
+            ),
+            [
+                {"id": row.id, "user1_id": row.user2_id, "user2_id": row.user1_id}
+                for row in rows
+            ],
+        )
+
+    # Merge duplicate matches into the earliest one, moving their messages over
+    rows = connection.execute(
+        sa.text(
+            "SELECT id, user1_id, user2_id FROM matches "
+            "ORDER BY user1_id, user2_id, created_at, id"
+        )
+    ).fetchall()
+    kept = {}
+    for row in rows:
+        pair = (row.user1_id, row.user2_id)
+        if pair not in kept:
+            kept[pair] = row.id
+            continue
+        connection.execute(
+            sa.text("UPDATE chat_messages SET match_id = :kept WHERE match_id = :duplicate"),
+            {"kept": kept[pair], "duplicate": row.id},
+        )
+        connection.execute(
+            sa.text("DELETE FROM matches WHERE id = :duplicate"),
+            {"duplicate": row.id},
+        )
+
+    op.create_unique_constraint(
+        'uq_matches_user_pair', 'matches', ['user1_id', 'user2_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_matches_user_pair', 'matches', type_='unique')
+    op.drop_constraint('uq_swipes_swiper_swiped', 'swipes', type_='unique')
@@ -0,0 +1,48 @@
+"""add profile geohash
+
+Revision ID: d55c970e6cd9
+Revises:
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services import geohash
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd55c970e6cd9'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('profiles', sa.Column('geohash', sa.String(length=12), nullable=True))
+    op.create_index('ix_profiles_geohash', 'profiles', ['geohash'], unique=False)
+
+    # Backfill cells for profiles that already have a location
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.text(
+            "SELECT id, latitude, longitude FROM profiles "
+            "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+        )
+    ).fetchall()
+    updates = [
+        {"id": row.id, "geohash": geohash.encode(row.latitude, row.longitude)}
+        for row in rows
+    ]
+    if updates:
+        connection.execute(
+            sa.text("UPDATE profiles SET geohash = :geohash WHERE id = :id"),
+            updates,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_profiles_geohash', table_name='profiles')
+    op.drop_column('profiles', 'geohash')
@@ -0,0 +1,45 @@
+"""add chat message history indexes
+
+Revision ID: f4f5b1c69e2a
+Revises: 89268e07b0a8
+Create Date: 2026-10-18 14:58:12.630471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4f5b1c69e2a'
+down_revision: Union[str, None] = '89268e07b0a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_chat_messages_match_id_created_at_id',
+        'chat_messages',
+        ['match_id', 'created_at', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_chat_room_messages_room_id_created_at_id',
+        'chat_room_messages',
+        ['room_id', 'created_at', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_nearby_chat_messages_chat_id_created_at_id',
+        'nearby_chat_messages',
+        ['chat_id', 'created_at', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_nearby_chat_messages_chat_id_created_at_id', table_name='nearby_chat_messages')
+    op.drop_index('ix_chat_room_messages_room_id_created_at_id', table_name='chat_room_messages')
+    op.drop_index('ix_chat_messages_match_id_created_at_id', table_name='chat_messages')
@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
 from app.models.user import User
 from app.models.swipe import Match
 from app.models.chat import ChatMessage
 from app.schemas.chat import ChatMessageCreate, ChatMessageResponse
+from app.services.chat_history import paginate_messages, MATCH_MESSAGES
+from app.services.message_buffer import MessageBuffer
+from app.services.chat_service import ChatService
+from app.services.message_writer import WriterBusyError
 
 router = APIRouter()
 
@@ -32,20 +36,27 @@ async def send_message(
             detail="Not part of this match",
         )
     
-    chat_message = ChatMessage(
-        match_id=match_id,
-        sender_id=current_user.id,
-        message=message_data.message,
-    )
-    db.add(chat_message)
-    db.commit()
-    db.refresh(chat_message)
-    return chat_message
+    try:
+        return await ChatService().send(
+            MATCH_MESSAGES,
+            match_id,
+            current_user.id,
+            message_data.message,
+            participant_ids=[match.user1_id, match.user2_id],
+        )
+    except WriterBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many messages, try again shortly",
+        )
 
 
 @router.get("/{match_id}/messages", response_model=List[ChatMessageResponse])
 async def get_messages(
     match_id: str,
+    limit: int = Query(100, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -63,11 +74,25 @@ async def get_messages(
             detail="Not part of this match",
         )
     
-    messages = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.match_id == match_id)
-        .order_by(ChatMessage.created_at)
-        .all()
-    )
-    return messages
+    # Opening a conversation is served from the recent-message buffer
+    if before is None and after is None:
+        body = MessageBuffer().latest(db, MATCH_MESSAGES, match_id, limit)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+    
+    try:
+        return paginate_messages(
+            db,
+            ChatMessage,
+            ChatMessage.match_id,
+            match_id,
+            limit,
+            before=before,
+            after=after,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
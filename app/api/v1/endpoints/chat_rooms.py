@@ -1,10 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
 from app.models.user import User
-from app.models.profile import Profile
 from app.models.chat_room import ChatRoom, ChatRoomMessage
 from app.schemas.chat_room import (
     ChatRoomCreate,
@@ -12,6 +11,10 @@ from app.schemas.chat_room import (
     ChatRoomMessageCreate,
     ChatRoomMessageResponse,
 )
+from app.services.chat_history import paginate_messages, ROOM_MESSAGES
+from app.services.message_buffer import MessageBuffer
+from app.services.chat_service import ChatService
+from app.services.message_writer import WriterBusyError
 
 router = APIRouter()
 
@@ -74,26 +77,28 @@ async def send_room_message(
             detail="Chat room not found",
         )
     
-    # Get sender name from profile
-    profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
-    sender_name = profile.name if profile else current_user.email
-    
-    room_message = ChatRoomMessage(
-        room_id=room_id,
-        sender_id=current_user.id,
-        sender_name=sender_name,
-        message=message_data.message,
-    )
-    db.add(room_message)
-    db.commit()
-    db.refresh(room_message)
-    return room_message
+    chat_service = ChatService()
+    try:
+        return await chat_service.send(
+            ROOM_MESSAGES,
+            room_id,
+            current_user.id,
+            message_data.message,
+            sender_name=chat_service.sender_name(db, current_user),
+        )
+    except WriterBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many messages, try again shortly",
+        )
 
 
 @router.get("/{room_id}/messages", response_model=List[ChatRoomMessageResponse])
 async def get_room_messages(
     room_id: str,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     db: Session = Depends(get_db),
 ):
     room = db.query(ChatRoom).filter(ChatRoom.id == room_id).first()
@@ -103,12 +108,25 @@ async def get_room_messages(
             detail="Chat room not found",
         )
     
-    messages = (
-        db.query(ChatRoomMessage)
-        .filter(ChatRoomMessage.room_id == room_id)
-        .order_by(ChatRoomMessage.created_at.desc())
-        .limit(limit)
-        .all()
-    )
-    return list(reversed(messages))
+    # Opening a conversation is served from the recent-message buffer
+    if before is None and after is None:
+        body = MessageBuffer().latest(db, ROOM_MESSAGES, room_id, limit)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+    
+    try:
+        return paginate_messages(
+            db,
+            ChatRoomMessage,
+            ChatRoomMessage.room_id,
+            room_id,
+            limit,
+            before=before,
+            after=after,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
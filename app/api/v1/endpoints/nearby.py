@@ -1,21 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
-from app.core.redis_client import redis_client
 from app.models.user import User
 from app.models.profile import Profile
 from app.models.nearby_chat import NearbyChat, NearbyChatMessage
 from app.schemas.nearby import (
     LocationUpdate,
     NearbyUserResponse,
+    NearbyUsersPage,
     NearbyChatResponse,
     NearbyChatMessageCreate,
     NearbyChatMessageResponse,
 )
-from app.services.location_service import LocationService
+from app.services.location_service import LocationService, decode_cursor
+from app.services.live_location_service import LiveLocationService
+from app.services.location_buffer import LocationBuffer
+from app.services.candidate_store import candidate_store
+from app.services.chat_history import paginate_messages, NEARBY_MESSAGES
+from app.services.message_buffer import MessageBuffer
+from app.services.chat_service import ChatService
+from app.services.message_writer import WriterBusyError
 
 router = APIRouter()
 
@@ -26,25 +33,18 @@ async def update_location(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    # Update profile location
-    profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
-    if not profile:
+    profile_exists = (
+        db.query(Profile.id).filter(Profile.user_id == current_user.id).first()
+    )
+    if not profile_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Profile not found",
         )
     
-    profile.latitude = location.latitude
-    profile.longitude = location.longitude
-    db.commit()
-    
-    # Update Redis for presence
-    redis_key = f"user:location:{current_user.id}"
-    redis_client.setex(
-        redis_key,
-        3600,  # 1 hour TTL
-        f"{location.latitude},{location.longitude}",
-    )
+    # Buffer the update; profiles.latitude/longitude are written in bulk batches
+    if LocationBuffer().record(current_user.id, location.latitude, location.longitude):
+        candidate_store.update_location(current_user.id, location.latitude, location.longitude)
     
     return {"message": "Location updated"}
 
@@ -52,22 +52,35 @@ async def update_location(
 @router.get("/users", response_model=List[NearbyUserResponse])
 async def get_nearby_users(
     radius_km: int = 10,
+    live: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    # Get current user's profile
-    my_profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
-    if not my_profile or not my_profile.latitude or not my_profile.longitude:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Please update your location first",
+    location_service = LocationService()
+    
+    if live:
+        # Answer from the Redis live location index, only hydrating matches
+        live_service = LiveLocationService()
+        position = live_service.get_position(current_user.id)
+        if position is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Please update your location first",
+            )
+        live_users = live_service.search(
+            position[0],
+            position[1],
+            radius_km,
+            exclude_user_id=current_user.id,
         )
+        return location_service.find_live_nearby_users(db, live_users)
+    
+    latitude, longitude = _get_my_position(current_user, db)
     
-    location_service = LocationService()
     nearby_users = location_service.find_nearby_users(
         db,
-        my_profile.latitude,
-        my_profile.longitude,
+        latitude,
+        longitude,
         radius_km,
         exclude_user_id=current_user.id,
     )
@@ -75,6 +88,52 @@ async def get_nearby_users(
     return nearby_users
 
 
+@router.get("/users/nearest", response_model=NearbyUsersPage)
+async def get_nearest_users(
+    radius_km: int = 10,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+    
+    latitude, longitude = _get_my_position(current_user, db)
+    
+    users, next_cursor = LocationService().find_nearest_users(
+        db,
+        latitude,
+        longitude,
+        radius_km,
+        limit,
+        exclude_user_id=current_user.id,
+        after=after,
+    )
+    return {"users": users, "next_cursor": next_cursor}
+
+
+def _get_my_position(current_user: User, db: Session) -> Tuple[float, float]:
+    # Prefer the latest buffered position over the last flushed one
+    position = LocationBuffer().latest(current_user.id)
+    if position is None:
+        my_profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
+        if not my_profile or not my_profile.latitude or not my_profile.longitude:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Please update your location first",
+            )
+        position = (my_profile.latitude, my_profile.longitude)
+    return position
+
+
 @router.get("/chat", response_model=NearbyChatResponse)
 async def get_or_create_nearby_chat(
     current_user: User = Depends(get_current_user),
@@ -123,26 +182,28 @@ async def send_nearby_chat_message(
             detail="Chat has expired",
         )
     
-    # Get sender name
-    profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
-    sender_name = profile.name if profile else current_user.email
-    
-    chat_message = NearbyChatMessage(
-        chat_id=chat_id,
-        sender_id=current_user.id,
-        sender_name=sender_name,
-        message=message_data.message,
-    )
-    db.add(chat_message)
-    db.commit()
-    db.refresh(chat_message)
-    return chat_message
+    chat_service = ChatService()
+    try:
+        return await chat_service.send(
+            NEARBY_MESSAGES,
+            chat_id,
+            current_user.id,
+            message_data.message,
+            sender_name=chat_service.sender_name(db, current_user),
+        )
+    except WriterBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many messages, try again shortly",
+        )
 
 
 @router.get("/chat/{chat_id}/messages", response_model=List[NearbyChatMessageResponse])
 async def get_nearby_chat_messages(
     chat_id: str,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=200),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
     db: Session = Depends(get_db),
 ):
     chat = db.query(NearbyChat).filter(NearbyChat.id == chat_id).first()
@@ -152,12 +213,25 @@ async def get_nearby_chat_messages(
             detail="Chat not found",
         )
     
-    messages = (
-        db.query(NearbyChatMessage)
-        .filter(NearbyChatMessage.chat_id == chat_id)
-        .order_by(NearbyChatMessage.created_at.desc())
-        .limit(limit)
-        .all()
-    )
-    return list(reversed(messages))
+    # Opening a conversation is served from the recent-message buffer
+    if before is None and after is None:
+        body = MessageBuffer().latest(db, NEARBY_MESSAGES, chat_id, limit)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+    
+    try:
+        return paginate_messages(
+            db,
+            NearbyChatMessage,
+            NearbyChatMessage.chat_id,
+            chat_id,
+            limit,
+            before=before,
+            after=after,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
 
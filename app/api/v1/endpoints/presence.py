@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Dict, List
+from app.core.config import settings
+from app.core.dependencies import get_current_user_id
+from app.services.presence_service import PresenceService
+
+router = APIRouter()
+
+
+@router.get("", response_model=Dict[str, bool])
+async def get_presence(
+    user_ids: List[str] = Query(...),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """Whether each user is online, e.g. for a match list or nearby users."""
+    if len(user_ids) > settings.PRESENCE_BULK_MAX_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.PRESENCE_BULK_MAX_USERS} users per request",
+        )
+    
+    return await PresenceService().online(user_ids)
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
 from app.models.user import User
@@ -8,6 +9,11 @@ from app.models.profile import Profile
 from app.schemas.profile import ProfileCreate, ProfileUpdate, ProfileResponse
 from typing import Optional as TypingOptional
 from app.services.s3_service import S3Service
+from app.services import geohash
+from app.services.location_buffer import LocationBuffer
+from app.services.discovery_service import DiscoveryService
+from app.services.candidate_store import candidate_store
+from app.services.match_cache import MatchCache
 
 router = APIRouter()
 
@@ -30,6 +36,7 @@ async def create_profile(
     db.add(profile)
     db.commit()
     db.refresh(profile)
+    candidate_store.upsert(profile)
     return profile
 
 
@@ -107,8 +114,32 @@ async def update_profile(
         # Extract just URLs for storage (Profile.photos is JSON array of strings)
         profile.photos = [img["url"] for img in photo_list]
     
+    # Keep the grid cell in sync with the coordinates
+    if profile.latitude is not None and profile.longitude is not None:
+        profile.geohash = geohash.encode(profile.latitude, profile.longitude)
+    else:
+        profile.geohash = None
+    
     db.commit()
     db.refresh(profile)
+    candidate_store.upsert(profile)
+    
+    # A direct write supersedes any buffered location update
+    if "latitude" in update_data or "longitude" in update_data:
+        location_buffer = LocationBuffer()
+        location_buffer.discard(current_user.id)
+        if profile.latitude is not None and profile.longitude is not None:
+            location_buffer.live_locations.update(
+                current_user.id, profile.latitude, profile.longitude
+            )
+    
+    # Matches embed this profile in their cached lists
+    MatchCache().invalidate_profile(db, current_user.id)
+    
+    # Queued discovery candidates were filtered with the old preferences
+    if {"gender", "gender_preference", "max_distance_km", "latitude", "longitude"} & update_data.keys():
+        DiscoveryService().invalidate(current_user.id)
+    
     return profile
 
 
@@ -133,35 +164,23 @@ async def upload_photo(
     profile.photos.append(photo_url)
     db.commit()
     db.refresh(profile)
+    MatchCache().invalidate_profile(db, current_user.id)
     return profile
 
 
 @router.get("/discover", response_model=List[ProfileResponse])
 async def discover_profiles(
+    limit: int = Query(settings.DISCOVER_PAGE_SIZE, ge=1, le=50),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     # Get current user's profile
-    my_profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
+    my_profile = db.query(Profile.id).filter(Profile.user_id == current_user.id).first()
     if not my_profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Profile not found. Please create your profile first.",
         )
     
-    # Query profiles based on preferences
-    query = db.query(Profile).filter(
-        Profile.user_id != current_user.id,
-        Profile.is_active == True,
-    )
-    
-    # Filter by gender preference
-    if my_profile.gender_preference != "all":
-        query = query.filter(Profile.gender == my_profile.gender_preference)
-    
-    # TODO: Add distance filtering using Haversine formula
-    # TODO: Exclude already swiped profiles
-    
-    profiles = query.limit(50).all()
-    return profiles
-
+    # Candidates are filtered and ranked ahead of time by the discovery worker
+    return DiscoveryService().next_page(db, current_user.id, limit)
@@ -1,12 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, get_current_user_id
 from app.models.user import User
-from app.models.profile import Profile
-from app.models.swipe import Swipe, Match
-from app.schemas.swipe import SwipeCreate, SwipeResponse, MatchResponse
+from app.schemas.swipe import (
+    SwipeCreate,
+    SwipeResponse,
+    SwipeBatchCreate,
+    SwipeBatchResponse,
+    LikeReceivedResponse,
+    LikesReceivedCount,
+    MatchResponse,
+)
+from app.services.swipe_service import SwipeService, AlreadySwipedError, InvalidSwipeError
+from app.services.match_service import MatchService
+from app.services.match_cache import MatchCache
+from app.services.likes_index import LikesIndex
+from app.services.swipe_stream import SwipeStream
 
 router = APIRouter()
 
@@ -17,78 +29,114 @@ async def create_swipe(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    # Check if already swiped
-    existing_swipe = (
-        db.query(Swipe)
-        .filter(
-            Swipe.swiper_id == current_user.id,
-            Swipe.swiped_id == swipe_data.swiped_id,
+    if swipe_data.swiped_id == current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot swipe on yourself",
         )
-        .first()
-    )
-    if existing_swipe:
+    
+    try:
+        if settings.SWIPE_INGEST_MODE == "stream":
+            # Acknowledge now; the stream consumer persists it in a batch
+            return SwipeStream().enqueue(
+                db,
+                current_user.id,
+                swipe_data.swiped_id,
+                swipe_data.is_like,
+            )
+        return SwipeService().record_swipe(
+            db,
+            current_user.id,
+            swipe_data.swiped_id,
+            swipe_data.is_like,
+        )
+    except AlreadySwipedError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Already swiped on this user",
         )
+    except InvalidSwipeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User not found",
+        )
+
+
+@router.post("/batch", response_model=SwipeBatchResponse)
+async def create_swipes_batch(
+    batch: SwipeBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    if len(batch.swipes) > settings.SWIPE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.SWIPE_BATCH_MAX_SIZE} swipes per batch",
+        )
     
-    # Create swipe
-    swipe = Swipe(
-        swiper_id=current_user.id,
-        swiped_id=swipe_data.swiped_id,
-        is_like=swipe_data.is_like,
+    results = SwipeService().record_swipes(
+        db,
+        current_user.id,
+        [(swipe.swiped_id, swipe.is_like) for swipe in batch.swipes],
     )
-    db.add(swipe)
-    
-    # Check for match (if like and other user also liked)
-    if swipe_data.is_like:
-        mutual_swipe = (
-            db.query(Swipe)
-            .filter(
-                Swipe.swiper_id == swipe_data.swiped_id,
-                Swipe.swiped_id == current_user.id,
-                Swipe.is_like == True,
-            )
-            .first()
+    return {"results": results}
+
+
+@router.get("/likes-received", response_model=List[LikeReceivedResponse])
+async def get_likes_received(
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    try:
+        return LikesIndex().page(db, user_id, limit, before=before)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
         )
-        if mutual_swipe:
-            # Create match
-            match = Match(user1_id=current_user.id, user2_id=swipe_data.swiped_id)
-            db.add(match)
-            db.commit()
-            return {"swipe": swipe, "is_match": True, "match_id": str(match.id)}
-    
-    db.commit()
-    return {"swipe": swipe, "is_match": False, "match_id": None}
+
+
+@router.get("/likes-received/count", response_model=LikesReceivedCount)
+async def get_likes_received_count(
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    return {"count": LikesIndex().count(db, user_id)}
 
 
 @router.get("/matches", response_model=List[MatchResponse])
 async def get_matches(
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = None,
+    include_last_message: bool = False,
+    user_id: str = Depends(get_current_user_id),
     db: Session = Depends(get_db),
 ):
-    matches = (
-        db.query(Match)
-        .filter(
-            (Match.user1_id == current_user.id) | (Match.user2_id == current_user.id)
-        )
-        .all()
-    )
+    # First pages are served straight from the cache as pre-serialized JSON
+    match_cache = MatchCache()
+    generation = None
+    if before is None:
+        cached, generation = match_cache.get(user_id, limit, include_last_message)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
     
-    result = []
-    for match in matches:
-        other_user_id = (
-            match.user2_id if match.user1_id == current_user.id else match.user1_id
+    try:
+        matches = MatchService().list_matches(
+            db,
+            user_id,
+            limit,
+            before=before,
+            include_last_message=include_last_message,
         )
-        other_profile = db.query(Profile).filter(Profile.user_id == other_user_id).first()
-        result.append(
-            {
-                "match_id": str(match.id),
-                "user_id": str(other_user_id),
-                "profile": other_profile,
-                "created_at": match.created_at,
-            }
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
         )
     
-    return result
-
+    body = match_cache.serialize(matches)
+    if generation is not None:
+        match_cache.set(user_id, limit, include_last_message, body, generation)
+    return Response(content=body, media_type="application/json")
@@ -1,43 +1,298 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.websocket.chat_websocket import manager
 import json
+from datetime import datetime
+from typing import Optional
+import msgpack
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect, WebSocketException, status
+from pydantic import ValidationError
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.dependencies import get_websocket_user_id
+from app.models.chat_room import ChatRoom
+from app.models.nearby_chat import NearbyChat
+from app.models.swipe import Match
+from app.models.user import User
+from app.schemas.chat import ChatMessageCreate, StreamFrame
+from app.services.chat_history import MATCH_MESSAGES, MESSAGE_KINDS, NEARBY_MESSAGES, ROOM_MESSAGES
+from app.services.chat_service import ChatService
+from app.services.message_buffer import MessageBuffer
+from app.services.message_writer import WriterBusyError
+from app.services.notification_service import NotificationService
+from app.services.presence_service import PRESENCE_KINDS, PresenceService
+from app.websocket.chat_websocket import (
+    MSGPACK_BATCH,
+    USER_CHANNEL,
+    Connection,
+    channel_name,
+    manager,
+    negotiate_subprotocol,
+)
 
 router = APIRouter()
 
 
-@router.websocket("/chat-rooms/{room_id}")
-async def chat_room_websocket(websocket: WebSocket, room_id: str):
-    await manager.connect(websocket, room_id)
+@router.websocket("/stream")
+async def stream_websocket(
+    websocket: WebSocket,
+    since: Optional[str] = Query(None),
+    user_id: str = Depends(get_websocket_user_id),
+):
+    """One connection per user for all of their conversations and events.
+
+    ``since`` is the last event ID seen; events missed since are replayed.
+    """
+    sender_name = _sender_name(user_id)
+    subprotocol = negotiate_subprotocol(websocket)
+    connection = await manager.accept(websocket, subprotocol, tagged=True, user_id=user_id)
+    presence = PresenceService()
+    chat_service = ChatService()
+    access = {}  # channel -> what _check_access loaded for it
     try:
+        await presence.connected(connection)
+        user_channel = channel_name(USER_CHANNEL, user_id)
+        await manager.subscribe(connection, user_channel)
+        for event in await NotificationService().missed(user_id, since):
+            await manager.send_personal_message(event, connection, user_channel)
+
         while True:
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
-            # Broadcast to all connections in the room
-            await manager.broadcast(json.dumps(message_data), room_id)
+            frame = _parse_frame(await manager.receive(connection), subprotocol, StreamFrame)
+            if frame is None:
+                await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+                break
+
+            channel = frame.channel
+            kind, _, conversation_id = channel.partition(":")
+            if frame.action == "subscribe":
+                if channel not in access:
+                    if len(access) >= settings.WS_MAX_SUBSCRIPTIONS:
+                        await _reply(connection, channel, error="Too many subscriptions")
+                        continue
+                    try:
+                        access[channel] = _check_access(kind, conversation_id, user_id)
+                    except ValueError as e:
+                        await _reply(connection, channel, error=str(e))
+                        continue
+                await manager.subscribe(connection, channel)
+                await _reply(connection, channel, event="subscribed")
+                if kind in PRESENCE_KINDS:
+                    snapshot = await presence.join(connection, channel)
+                    await manager.send_personal_message(
+                        json.dumps({"event": "snapshot", **snapshot}),
+                        connection,
+                        channel,
+                    )
+            elif frame.action == "unsubscribe":
+                if access.pop(channel, None) is not None:
+                    await manager.unsubscribe(connection, channel)
+                    await presence.leave(connection, [channel])
+                await _reply(connection, channel, event="unsubscribed")
+            elif frame.action == "send":
+                if channel not in access:
+                    await _reply(connection, channel, error="Not subscribed")
+                    continue
+                if frame.message is None:
+                    await _reply(connection, channel, error="Missing message")
+                    continue
+                try:
+                    await _send(
+                        chat_service,
+                        kind,
+                        conversation_id,
+                        user_id,
+                        sender_name,
+                        access[channel],
+                        frame.message,
+                    )
+                except ValueError as e:
+                    await _reply(connection, channel, error=str(e))
+                except WriterBusyError:
+                    await _reply(connection, channel, error="Too many messages, try again shortly")
+            elif frame.action == "typing":
+                if channel not in access or kind not in PRESENCE_KINDS:
+                    await _reply(connection, channel, error="Not subscribed")
+                    continue
+                await presence.typing(user_id, channel, frame.typing)
     except WebSocketDisconnect:
-        manager.disconnect(websocket, room_id)
+        pass
+    finally:
+        await manager.disconnect(connection)
+        await presence.leave(connection, access)
+        await presence.disconnected(connection)
+
+
+@router.websocket("/chat-rooms/{room_id}")
+async def chat_room_websocket(
+    websocket: WebSocket,
+    room_id: str,
+    user_id: str = Depends(get_websocket_user_id),
+):
+    await _chat_session(websocket, ROOM_MESSAGES, room_id, user_id)
 
 
 @router.websocket("/chat/{match_id}")
-async def match_chat_websocket(websocket: WebSocket, match_id: str):
-    await manager.connect(websocket, match_id)
-    try:
-        while True:
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
-            await manager.broadcast(json.dumps(message_data), match_id)
-    except WebSocketDisconnect:
-        manager.disconnect(websocket, match_id)
+async def match_chat_websocket(
+    websocket: WebSocket,
+    match_id: str,
+    user_id: str = Depends(get_websocket_user_id),
+):
+    await _chat_session(websocket, MATCH_MESSAGES, match_id, user_id)
 
 
 @router.websocket("/nearby-chat/{chat_id}")
-async def nearby_chat_websocket(websocket: WebSocket, chat_id: str):
-    await manager.connect(websocket, chat_id)
+async def nearby_chat_websocket(
+    websocket: WebSocket,
+    chat_id: str,
+    user_id: str = Depends(get_websocket_user_id),
+):
+    await _chat_session(websocket, NEARBY_MESSAGES, chat_id, user_id)
+
+
+async def _chat_session(websocket: WebSocket, kind: str, conversation_id: str, user_id: str):
+    """Relay and persist a user's messages for the life of the connection.
+
+    Clients send ``{"message": "..."}`` frames (or the MessagePack equivalent
+    under the msgpack subprotocol); every connection in the conversation
+    receives the stored message, as its REST endpoint returns it. These
+    sockets count towards presence but receive no presence or typing events.
+    """
+    sender_name = _sender_name(user_id)
     try:
+        access = _check_access(kind, conversation_id, user_id)
+    except ValueError as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+
+    chat_service = ChatService()
+    presence = PresenceService()
+    channel = channel_name(kind, conversation_id)
+    subprotocol = negotiate_subprotocol(websocket)
+    connection = await manager.connect(websocket, channel, subprotocol, user_id=user_id)
+    try:
+        await presence.connected(connection)
+        if kind in PRESENCE_KINDS:
+            await presence.join(connection, channel)
         while True:
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
-            await manager.broadcast(json.dumps(message_data), chat_id)
+            message_data = _parse_frame(await manager.receive(connection), subprotocol, ChatMessageCreate)
+            if message_data is None:
+                await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+                break
+
+            try:
+                await _send(
+                    chat_service,
+                    kind,
+                    conversation_id,
+                    user_id,
+                    sender_name,
+                    access,
+                    message_data.message,
+                )
+            except ValueError as e:
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e))
+                break
+            except WriterBusyError:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                break
     except WebSocketDisconnect:
-        manager.disconnect(websocket, chat_id)
+        pass
+    finally:
+        await manager.disconnect(connection)
+        await presence.leave(connection, [channel])
+        await presence.disconnected(connection)
+
+
+async def _send(
+    chat_service: ChatService,
+    kind: str,
+    conversation_id: str,
+    user_id: str,
+    sender_name: str,
+    access: dict,
+    text: str,
+):
+    """Persist a message and publish it to the conversation's channel.
+
+    Raises ValueError if it can't be sent there anymore.
+    """
+    if access["expires_at"] and access["expires_at"] < datetime.utcnow():
+        raise ValueError("Chat has expired")
+
+    message = await chat_service.send(
+        kind,
+        conversation_id,
+        user_id,
+        text,
+        sender_name=sender_name,
+        participant_ids=access["participant_ids"],
+    )
+    channel = channel_name(kind, conversation_id)
+    await manager.broadcast(MessageBuffer().serialize(kind, message).decode(), channel)
+    if kind in PRESENCE_KINDS:
+        await PresenceService().clear_typing(user_id, channel)
+
+
+async def _reply(
+    connection: Connection,
+    channel: str,
+    event: str = "error",
+    error: Optional[str] = None,
+):
+    data = {"event": event}
+    if error is not None:
+        data["detail"] = error
+    await manager.send_personal_message(json.dumps(data), connection, channel)
+
+
+def _parse_frame(frame, subprotocol: Optional[str], schema):
+    try:
+        if isinstance(frame, str):
+            return schema.model_validate_json(frame)
+        if subprotocol == MSGPACK_BATCH:
+            return schema.model_validate(msgpack.unpackb(frame))
+    except (ValidationError, ValueError, msgpack.UnpackException):
+        pass
+    return None
+
+
+def _sender_name(user_id: str) -> str:
+    """Display name for the connection's messages, loaded once at the handshake."""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise WebSocketException(
+                code=status.WS_1008_POLICY_VIOLATION,
+                reason="Could not validate credentials",
+            )
+        return ChatService().sender_name(db, user)
+    finally:
+        db.close()
+
+
+def _check_access(kind: str, conversation_id: str, user_id: str) -> dict:
+    """Check the user may use a conversation and load what sending needs.
+
+    Raises ValueError with the reason if not.
+    """
+    if kind not in MESSAGE_KINDS:
+        raise ValueError("Unknown channel")
+
+    db = SessionLocal()
+    try:
+        participant_ids = ()
+        expires_at = None
+        if kind == MATCH_MESSAGES:
+            match = db.query(Match).filter(Match.id == conversation_id).first()
+            if not match or user_id not in (match.user1_id, match.user2_id):
+                raise ValueError("Not part of this match")
+            participant_ids = (match.user1_id, match.user2_id)
+        elif kind == ROOM_MESSAGES:
+            if not db.query(ChatRoom.id).filter(ChatRoom.id == conversation_id).first():
+                raise ValueError("Chat room not found")
+        else:
+            chat = db.query(NearbyChat).filter(NearbyChat.id == conversation_id).first()
+            if not chat or chat.expires_at < datetime.utcnow():
+                raise ValueError("Chat not found or expired")
+            expires_at = chat.expires_at
 
+        return {"participant_ids": participant_ids, "expires_at": expires_at}
+    finally:
+        db.close()
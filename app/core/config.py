@@ -33,6 +33,68 @@ class Settings(BaseSettings):
     
     # Location
     NEARBY_RADIUS_KM: int = 10
+    NEARBY_PRECISE_DISTANCE: bool = False  # Re-check radius boundary with ellipsoidal distance
+    NEARBY_INITIAL_RING_KM: float = 1.0  # First ring of the nearest-users search
+    LIVE_LOCATION_TTL_SECONDS: int = 3600  # How long a reported location counts as live
+    LOCATION_MIN_MOVE_METERS: int = 50  # Smaller moves are not written to the database
+    LOCATION_FLUSH_INTERVAL_SECONDS: int = 5
+    LOCATION_FLUSH_BATCH_SIZE: int = 500
+    LOCATION_FLUSH_ORPHAN_SECONDS: int = 300  # Batches claimed longer ago are put back on startup
+    
+    # Discovery
+    DISCOVER_PAGE_SIZE: int = 20
+    DISCOVER_QUEUE_SIZE: int = 200  # Candidates kept ready per user
+    DISCOVER_LOW_WATER_MARK: int = 50  # Queue length that triggers a background refill
+    DISCOVER_SERVED_TTL_SECONDS: int = 86400  # How long served profiles are not re-queued
+    DISCOVER_REFILL_INTERVAL_SECONDS: int = 2
+    DISCOVER_REFILL_BATCH_SIZE: int = 50
+    CANDIDATE_STORE_REFRESH_SECONDS: int = 5  # Pull profile changes from other workers
+    
+    # Swipes & Matches
+    SWIPE_INGEST_MODE: str = "sync"  # 'sync' or 'stream' (Redis Stream + batch consumer)
+    SWIPE_STREAM_BATCH_SIZE: int = 500
+    SWIPE_STREAM_BLOCK_MS: int = 1000
+    SWIPE_STREAM_CLAIM_IDLE_MS: int = 60000  # Reclaim entries a dead consumer left pending
+    SWIPE_STREAM_MAXLEN: int = 1000000
+    SWIPE_STREAM_MAX_DELIVERIES: int = 10  # Then the entry moves to the dead-letter stream
+    SWIPE_STREAM_PENDING_TTL_SECONDS: int = 3600  # Duplicate check for swipes not yet persisted
+    SWIPE_BATCH_MAX_SIZE: int = 100
+    SWIPE_BLOOM_BITS: int = 131072  # 16KB per user, ~1% false positives at 13k swipes
+    SWIPE_BLOOM_HASHES: int = 7
+    SWIPE_BLOOM_TTL_SECONDS: int = 604800  # Idle filters are rebuilt from swipes on demand
+    MATCH_CACHE_TTL_SECONDS: int = 3600
+    
+    # Chat
+    CHAT_RECENT_MESSAGES: int = 100  # Per-conversation Redis buffer for history reads
+    CHAT_RECENT_TTL_SECONDS: int = 86400
+    CHAT_WRITE_QUEUE_SIZE: int = 10000  # Messages waiting for MySQL before senders get 503s
+    CHAT_WRITE_BATCH_SIZE: int = 500
+    CHAT_WRITE_FLUSH_INTERVAL_SECONDS: float = 0.05
+    CHAT_WRITE_ENQUEUE_TIMEOUT_SECONDS: float = 1.0
+    CHAT_WRITE_RETRY_INITIAL_SECONDS: float = 0.5  # Backoff while MySQL is unavailable
+    CHAT_WRITE_RETRY_MAX_SECONDS: float = 30.0
+    CHAT_WRITE_SHUTDOWN_TIMEOUT_SECONDS: float = 10.0  # Then what is still queued is lost
+    
+    # WebSockets
+    WS_SEND_QUEUE_SIZE: int = 256  # Outbound messages buffered per connection
+    WS_SLOW_CONSUMER_POLICY: str = "drop"  # 'drop' new messages or 'disconnect' when full
+    WS_BATCH_INTERVAL_MS: int = 25  # Frame coalescing tick for the batch subprotocols
+    WS_BATCH_MAX_MESSAGES: int = 100
+    WS_PER_MESSAGE_DEFLATE: bool = True
+    WS_MAX_SUBSCRIPTIONS: int = 200  # Channels per /ws/stream connection
+    WS_MAX_CONNECTIONS: int = 100000  # Per worker; further handshakes are refused with 1013
+    WS_PING_INTERVAL_SECONDS: float = 20.0  # Protocol-level pings, also the idle check period
+    WS_PING_TIMEOUT_SECONDS: float = 20.0
+    WS_IDLE_TIMEOUT_SECONDS: int = 900  # Close connections that sent nothing for this long
+    MISSED_EVENTS_MAXLEN: int = 100  # Per-user events kept for replay on reconnect
+    MISSED_EVENTS_TTL_SECONDS: int = 604800
+    
+    # Presence
+    PRESENCE_TTL_SECONDS: int = 60  # Online/in-conversation marks expire unless refreshed
+    PRESENCE_REFRESH_SECONDS: float = 20.0
+    TYPING_TTL_SECONDS: int = 5  # Also the debounce window for repeated typing frames
+    PRESENCE_UPDATES_PER_MINUTE: int = 60  # Presence and typing events per user
+    PRESENCE_BULK_MAX_USERS: int = 200
     
     class Config:
         env_file = ".env"
@@ -1,4 +1,5 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, WebSocket, WebSocketException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.core.database import get_db
@@ -27,3 +28,40 @@ async def get_current_user(
         raise credentials_exception
     return user
 
+
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
+    """Authenticate from the token alone, without loading the user row.
+
+    For hot read paths that only need the caller's ID.
+    """
+    payload = decode_token(token)
+    user_id = payload.get("sub") if payload else None
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+
+async def get_websocket_user_id(
+    websocket: WebSocket, token: Optional[str] = Query(None)
+) -> str:
+    """Authenticate a websocket handshake once, before it is accepted.
+
+    Browsers can't set headers on websocket requests, so the token may also
+    be passed as the ``token`` query parameter.
+    """
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer":
+            token = credentials
+    payload = decode_token(token) if token else None
+    user_id = payload.get("sub") if payload else None
+    if user_id is None:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION,
+            reason="Could not validate credentials",
+        )
+    return user_id
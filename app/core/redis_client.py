@@ -1,5 +1,11 @@
 import redis
+import redis.asyncio
 from app.core.config import settings
 
 redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
 
+# For raw bytes values (bitmaps, serialized payloads)
+redis_binary_client = redis.from_url(settings.REDIS_URL)
+
+# For code running on the event loop (pub/sub fan-out)
+redis_async_client = redis.asyncio.from_url(settings.REDIS_URL)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 import uuid
 from app.core.database import Base
@@ -6,6 +6,10 @@ from app.core.database import Base
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # Keyset pagination of a conversation's history
+        Index("ix_chat_messages_match_id_created_at_id", "match_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     match_id = Column(String(36), ForeignKey("matches.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, Index
 from sqlalchemy.sql import func
 import uuid
 from app.core.database import Base
@@ -17,6 +17,10 @@ class ChatRoom(Base):
 
 class ChatRoomMessage(Base):
     __tablename__ = "chat_room_messages"
+    __table_args__ = (
+        # Keyset pagination of a room's history
+        Index("ix_chat_room_messages_room_id_created_at_id", "room_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     room_id = Column(String(36), ForeignKey("chat_rooms.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, Index
 from sqlalchemy.sql import func
 import uuid
 from app.core.database import Base
@@ -15,6 +15,10 @@ class NearbyChat(Base):
 
 class NearbyChatMessage(Base):
     __tablename__ = "nearby_chat_messages"
+    __table_args__ = (
+        # Keyset pagination of a chat's history
+        Index("ix_nearby_chat_messages_chat_id_created_at_id", "chat_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     chat_id = Column(String(36), ForeignKey("nearby_chats.id"), nullable=False)
@@ -18,6 +18,7 @@ class Profile(Base):
     photos = Column(JSON, default=list)  # Array of S3 URLs (stored as JSON text in MariaDB)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True, index=True)  # Grid cell for nearby lookups
     max_distance_km = Column(Integer, default=50)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, server_default=func.now())
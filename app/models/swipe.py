@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -7,6 +7,12 @@ from app.core.database import Base
 
 class Swipe(Base):
     __tablename__ = "swipes"
+    __table_args__ = (
+        # One swipe per pair; also serves the reciprocal (swiped -> swiper) lookup
+        UniqueConstraint("swiper_id", "swiped_id", name="uq_swipes_swiper_swiped"),
+        # Inbound likes, for rebuilding the likes-received index
+        Index("ix_swipes_swiped_id_created_at", "swiped_id", "created_at"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     swiper_id = Column(String(36), ForeignKey("users.id"), nullable=False)
@@ -17,6 +23,13 @@ class Swipe(Base):
 
 class Match(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        # Pairs are stored canonically with user1_id < user2_id
+        UniqueConstraint("user1_id", "user2_id", name="uq_matches_user_pair"),
+        # A user's matches, newest first, from either side of the pair
+        Index("ix_matches_user1_id_created_at", "user1_id", "created_at"),
+        Index("ix_matches_user2_id_created_at", "user2_id", "created_at"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user1_id = Column(String(36), ForeignKey("users.id"), nullable=False)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Literal, Optional
 
 
 class ChatMessageCreate(BaseModel):
@@ -16,3 +17,9 @@ class ChatMessageResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+class StreamFrame(BaseModel):
+    action: Literal["subscribe", "unsubscribe", "send", "typing"]
+    channel: str  # e.g. 'match:{match_id}', 'room:{room_id}', 'nearby:{chat_id}'
+    message: Optional[str] = None
+    typing: bool = True  # For 'typing': false when the user stopped
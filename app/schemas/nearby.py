@@ -1,12 +1,12 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 from app.schemas.profile import ProfileResponse
 
 
 class LocationUpdate(BaseModel):
-    latitude: float
-    longitude: float
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
 
 
 class NearbyUserResponse(BaseModel):
@@ -15,6 +15,11 @@ class NearbyUserResponse(BaseModel):
     distance_km: float
 
 
+class NearbyUsersPage(BaseModel):
+    users: List[NearbyUserResponse]
+    next_cursor: Optional[str] = None
+
+
 class NearbyChatResponse(BaseModel):
     id: str
     name: str
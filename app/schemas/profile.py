@@ -29,8 +29,8 @@ class ProfileUpdate(BaseModel):
     gender: Optional[str] = None
     gender_preference: Optional[str] = Field(None, alias="genderPreference")
     max_distance_km: Optional[int] = Field(None, alias="maxDistanceKm")
-    latitude: Optional[float] = None
-    longitude: Optional[float] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
     images: Optional[List[ProfileImageUpdate]] = None
 
     class Config:
@@ -1,7 +1,8 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 from app.schemas.profile import ProfileResponse
+from app.schemas.chat import ChatMessageResponse
 
 
 class SwipeCreate(BaseModel):
@@ -15,9 +16,35 @@ class SwipeResponse(BaseModel):
     match_id: Optional[str] = None
 
 
+class SwipeBatchCreate(BaseModel):
+    swipes: List[SwipeCreate] = Field(..., min_length=1)
+
+
+class SwipeBatchItemResult(BaseModel):
+    swiped_id: str
+    status: str  # 'created', 'duplicate' (already swiped) or 'invalid'
+    is_match: bool = False
+    match_id: Optional[str] = None
+
+
+class SwipeBatchResponse(BaseModel):
+    results: List[SwipeBatchItemResult]
+
+
+class LikeReceivedResponse(BaseModel):
+    user_id: str
+    profile: ProfileResponse
+    liked_at: datetime
+
+
+class LikesReceivedCount(BaseModel):
+    count: int
+
+
 class MatchResponse(BaseModel):
     match_id: str
     user_id: str
     profile: ProfileResponse
     created_at: datetime
+    last_message: Optional[ChatMessageResponse] = None
 
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.profile import Profile
+from app.services.distance import haversine_km
+from app.services.geohash import bounding_box
+
+logger = logging.getLogger(__name__)
+
+# Reserved code for the "all" gender preference
+ALL_GENDERS = 0
+
+_COLUMNS = {
+    "age": np.int16,
+    "gender": np.int16,
+    "preference": np.int16,
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "max_distance_km": np.float32,
+    "active": np.bool_,
+}
+
+
+class CandidateStore:
+    """Array-backed, in-process copy of the profile fields used by discovery.
+
+    Each profile gets a dense ordinal; its fields live at that position in one
+    NumPy array per column so all discovery filters can run as vectorized
+    masks. The store is loaded once, then kept current from profile writes in
+    this process and by periodically pulling rows changed by other workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ordinals: Dict[str, int] = {}
+        self._user_ids: List[str] = []
+        self._codes: Dict[str, int] = {"all": ALL_GENDERS}
+        self._size = 0
+        self._capacity = 0
+        self._synced_at: Optional[datetime] = None
+        for name, dtype in _COLUMNS.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+
+    @property
+    def loaded(self) -> bool:
+        return self._synced_at is not None
+
+    def upsert(self, profile: Profile) -> None:
+        with self._lock:
+            self._upsert_or_skip(profile)
+
+    def update_location(self, user_id: str, latitude: float, longitude: float) -> None:
+        with self._lock:
+            ordinal = self._ordinals.get(user_id)
+            if ordinal is not None:
+                self.latitude[ordinal] = latitude
+                self.longitude[ordinal] = longitude
+
+    def refresh(self, db: Session) -> int:
+        """Load profiles changed since the last refresh (all of them the first time)."""
+        with self._lock:
+            synced_at = self._synced_at
+        query = db.query(
+            Profile.user_id,
+            Profile.age,
+            Profile.gender,
+            Profile.gender_preference,
+            Profile.latitude,
+            Profile.longitude,
+            Profile.max_distance_km,
+            Profile.is_active,
+            Profile.created_at,
+            Profile.updated_at,
+        )
+        if synced_at is not None:
+            # Timestamps have second precision, so overlap the previous window
+            since = synced_at - timedelta(seconds=1)
+            query = query.filter(
+                or_(Profile.updated_at >= since, Profile.created_at >= since)
+            )
+        rows = query.order_by(Profile.created_at).all()
+
+        with self._lock:
+            synced_at = self._synced_at or datetime.min
+            for row in rows:
+                self._upsert_or_skip(row)
+                changed_at = max(row.created_at or datetime.min, row.updated_at or datetime.min)
+                synced_at = max(synced_at, changed_at)
+            self._synced_at = synced_at
+        return len(rows)
+
+    def match(
+        self,
+        profile: Profile,
+        position: Optional[Tuple[float, float]],
+        limit: int,
+        exclude: Callable[[str], bool],
+        min_age: Optional[int] = None,
+        max_age: Optional[int] = None,
+    ) -> List[str]:
+        """User IDs that pass both users' filters, nearest first.
+
+        Without a position, distance isn't filtered and profiles come in
+        reverse load order: newest created first within each refresh, and
+        later refreshes' new profiles before earlier ones. ``exclude`` is
+        checked in ranked order until ``limit`` candidates are found.
+        """
+        with self._lock:
+            size = self._size
+            mask = self.active[:size].copy()
+            own_ordinal = self._ordinals.get(profile.user_id)
+            if own_ordinal is not None:
+                mask[own_ordinal] = False
+
+            # They must be what I'm looking for, and I must be what they're looking for
+            if profile.gender_preference != "all":
+                wanted = self._codes.get(profile.gender_preference)
+                if wanted is None:
+                    return []
+                mask &= self.gender[:size] == wanted
+            my_gender = self._codes.get(profile.gender, -1)
+            preference = self.preference[:size]
+            mask &= (preference == my_gender) | (preference == ALL_GENDERS)
+
+            if min_age is not None:
+                mask &= self.age[:size] >= min_age
+            if max_age is not None:
+                mask &= self.age[:size] <= max_age
+
+            if position is None:
+                indices = np.flatnonzero(mask)[::-1]
+            else:
+                latitude, longitude = position
+                max_distance_km = profile.max_distance_km or 50
+                # Cheap latitude band first so trig only runs near the user
+                delta_lat, _ = bounding_box(latitude, longitude, max_distance_km)
+                mask &= np.abs(self.latitude[:size] - latitude) <= delta_lat
+                indices = np.flatnonzero(mask)
+                distances = haversine_km(
+                    latitude,
+                    longitude,
+                    self.latitude[indices],
+                    self.longitude[indices],
+                )
+                within = (distances <= max_distance_km) & (
+                    distances <= self.max_distance_km[indices]
+                )
+                indices = indices[within]
+                indices = indices[np.argsort(distances[within], kind="stable")]
+
+            ranked = [self._user_ids[i] for i in indices]
+
+        candidates = []
+        for user_id in ranked:
+            if not exclude(user_id):
+                candidates.append(user_id)
+                if len(candidates) >= limit:
+                    break
+        return candidates
+
+    async def run(self) -> None:
+        """Pull profile changes periodically until cancelled."""
+        while True:
+            try:
+                await asyncio.to_thread(self._refresh_once)
+            except Exception as e:
+                logger.error(f"Candidate store refresh failed: {str(e)}", exc_info=True)
+            await asyncio.sleep(settings.CANDIDATE_STORE_REFRESH_SECONDS)
+
+    def _refresh_once(self) -> None:
+        db = SessionLocal()
+        try:
+            changed = self.refresh(db)
+            if changed:
+                logger.info(f"Candidate store refreshed {changed} profiles")
+        finally:
+            db.close()
+
+    def _upsert_or_skip(self, profile) -> None:
+        """Store a profile, or take it out of discovery if its fields don't fit."""
+        try:
+            self._upsert(profile)
+        except (TypeError, ValueError, OverflowError) as e:
+            logger.warning(f"Skipping profile {profile.user_id} in candidate store: {str(e)}")
+            ordinal = self._ordinals.get(profile.user_id)
+            if ordinal is not None:
+                self.active[ordinal] = False
+
+    def _upsert(self, profile) -> None:
+        ordinal = self._ordinals.get(profile.user_id)
+        if ordinal is None:
+            ordinal = self._size
+            self._grow(ordinal + 1)
+            self._ordinals[profile.user_id] = ordinal
+            self._user_ids.append(profile.user_id)
+            self._size += 1
+
+        self.age[ordinal] = profile.age
+        self.gender[ordinal] = self._code(profile.gender)
+        self.preference[ordinal] = self._code(profile.gender_preference)
+        self.latitude[ordinal] = np.nan if profile.latitude is None else profile.latitude
+        self.longitude[ordinal] = np.nan if profile.longitude is None else profile.longitude
+        self.max_distance_km[ordinal] = profile.max_distance_km or 50
+        self.active[ordinal] = bool(profile.is_active)
+
+    def _code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._codes)
+            self._codes[value] = code
+        return code
+
+    def _grow(self, size: int) -> None:
+        if size <= self._capacity:
+            return
+        capacity = max(size, self._capacity * 2, 1024)
+        for name, dtype in _COLUMNS.items():
+            column = np.zeros(capacity, dtype=dtype)
+            column[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, column)
+        self._capacity = capacity
+
+
+candidate_store = CandidateStore()
@@ -0,0 +1,130 @@
+import secrets
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.models.chat import ChatMessage
+from app.models.chat_room import ChatRoomMessage
+from app.models.nearby_chat import NearbyChatMessage
+
+# Conversation kinds
+MATCH_MESSAGES = "match"
+ROOM_MESSAGES = "room"
+NEARBY_MESSAGES = "nearby"
+
+# kind -> (message model, name of the conversation column)
+MESSAGE_KINDS = {
+    MATCH_MESSAGES: (ChatMessage, "match_id"),
+    ROOM_MESSAGES: (ChatRoomMessage, "room_id"),
+    NEARBY_MESSAGES: (NearbyChatMessage, "chat_id"),
+}
+
+_last_ms = 0
+_sequence = 0
+
+
+def new_message_id() -> str:
+    """A UUIDv7: IDs made later in this process sort after earlier ones.
+
+    The first 48 bits are the Unix time in milliseconds, so IDs made in the
+    same second also order by when they were sent.
+    """
+    global _last_ms, _sequence
+    now_ms = time.time_ns() // 1_000_000
+    if now_ms > _last_ms:
+        _last_ms, _sequence = now_ms, 0
+    elif _sequence < 0xFFF:
+        _sequence += 1
+    else:
+        _last_ms, _sequence = _last_ms + 1, 0
+    value = (
+        _last_ms << 80
+        | 0x7 << 76  # Version
+        | _sequence << 64
+        | 0b10 << 62  # Variant
+        | secrets.randbits(62)
+    )
+    return str(uuid.UUID(int=value))
+
+
+def message_id_ms(message_id: str) -> Optional[int]:
+    """When a UUIDv7 message ID was made, in Unix milliseconds; None for other IDs."""
+    try:
+        value = uuid.UUID(message_id)
+    except ValueError:
+        return None
+    if value.version != 7:
+        return None
+    return value.int >> 80
+
+
+def paginate_messages(
+    db: Session,
+    model,
+    scope_column,
+    scope_id: str,
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> List:
+    """A page of a conversation's messages, oldest first.
+
+    Shared by match, room and nearby chats. ``model`` is the message model and
+    ``scope_column`` the column identifying the conversation; each table has
+    a ``(scope, created_at, id)`` index, so every page is a range scan.
+
+    Without a cursor this is the latest ``limit`` messages. ``before`` and
+    ``after`` are message IDs: the page just older or just newer than that
+    message. Time-ordered IDs carry their own timestamp, so they work as
+    cursors without a lookup, even before the message is written. Raises
+    ValueError for an unknown cursor or for both at once.
+    """
+    if before and after:
+        raise ValueError("Use either before or after")
+
+    query = db.query(model).filter(scope_column == scope_id)
+    cursor_id = before or after
+    if cursor_id:
+        cursor_ms = message_id_ms(cursor_id)
+        if cursor_ms is not None:
+            # As ChatService.send stamps it
+            cursor = (datetime.utcfromtimestamp(cursor_ms // 1000), cursor_id)
+        else:
+            cursor = (
+                db.query(model.created_at, model.id)
+                .filter(model.id == cursor_id, scope_column == scope_id)
+                .first()
+            )
+        if cursor is None:
+            raise ValueError("Invalid cursor")
+        cursor_created_at, cursor_id = cursor
+        if before:
+            query = query.filter(
+                or_(
+                    model.created_at < cursor_created_at,
+                    and_(model.created_at == cursor_created_at, model.id < cursor_id),
+                )
+            )
+        else:
+            query = query.filter(
+                or_(
+                    model.created_at > cursor_created_at,
+                    and_(model.created_at == cursor_created_at, model.id > cursor_id),
+                )
+            )
+
+    if after:
+        return (
+            query.order_by(model.created_at, model.id)
+            .limit(limit)
+            .all()
+        )
+
+    messages = (
+        query.order_by(model.created_at.desc(), model.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return list(reversed(messages))
@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy.orm import Session
+from app.models.profile import Profile
+from app.models.user import User
+from app.services.chat_history import MATCH_MESSAGES, MESSAGE_KINDS, message_id_ms, new_message_id
+from app.services.message_writer import message_writer
+
+
+class ChatService:
+    """Sending messages to match, room and nearby chats."""
+
+    def __init__(self, writer=message_writer):
+        self.writer = writer
+
+    async def send(
+        self,
+        kind: str,
+        conversation_id: str,
+        sender_id: str,
+        text: str,
+        sender_name: Optional[str] = None,
+        participant_ids: Iterable[str] = (),
+    ) -> dict:
+        """Queue a message for writing and return it as stored.
+
+        The ID and timestamp are assigned here so the message can be returned
+        before it reaches MySQL; IDs are time-ordered, so messages sent
+        within the same second page in the order they were sent. Raises ``WriterBusyError`` if the writer is
+        too far behind to accept it.
+        """
+        _, column = MESSAGE_KINDS[kind]
+        message_id = new_message_id()
+        message = {
+            "id": message_id,
+            column: conversation_id,
+            "sender_id": sender_id,
+            "message": text,
+            # From the ID's own clock, so the two order alike; DATETIME
+            # columns keep whole seconds
+            "created_at": datetime.utcfromtimestamp(message_id_ms(message_id) // 1000),
+        }
+        if kind != MATCH_MESSAGES:
+            message["sender_name"] = sender_name
+
+        await self.writer.submit(kind, message, participant_ids)
+        return message
+
+    def sender_name(self, db: Session, user: User) -> str:
+        profile = db.query(Profile.name).filter(Profile.user_id == user.id).first()
+        return profile.name if profile else user.email
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_client import redis_client
+from app.models.profile import Profile
+from app.services.candidate_store import candidate_store
+from app.services.location_buffer import LocationBuffer
+from app.services.swipe_filter import SwipeBloomFilter
+
+logger = logging.getLogger(__name__)
+
+# Release a lock only if we still hold it; it may have expired and been
+# taken by another worker
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class DiscoveryService:
+    """Per-user queues of pre-filtered, ranked discovery candidates.
+
+    ``GET /profiles/discover`` pops pages off ``discover:queue:{user_id}``.
+    When a queue drops below ``DISCOVER_LOW_WATER_MARK`` the user is added to
+    ``discover:refill`` and the background worker tops it up.
+    """
+
+    REFILL_KEY = "discover:refill"
+
+    def __init__(self, client=redis_client):
+        self.redis = client
+        self._release = self.redis.register_script(_RELEASE_SCRIPT)
+
+    def next_page(self, db: Session, user_id: str, limit: int) -> List[Profile]:
+        queue_key = self._queue_key(user_id)
+        user_ids = self.redis.lpop(queue_key, limit)
+        if not user_ids:
+            # Cold queue: fill it inline once rather than returning nothing
+            self.refill(db, user_id)
+            user_ids = self.redis.lpop(queue_key, limit) or []
+
+        pipe = self.redis.pipeline()
+        pipe.llen(queue_key)
+        if user_ids:
+            # Scored by when they were served, so each ages out on its own
+            now = time.time()
+            served_key = self._served_key(user_id)
+            pipe.zadd(served_key, {served_id: now for served_id in user_ids})
+            pipe.zremrangebyscore(served_key, "-inf", now - settings.DISCOVER_SERVED_TTL_SECONDS)
+            pipe.expire(served_key, settings.DISCOVER_SERVED_TTL_SECONDS)
+        remaining = pipe.execute()[0]
+        if remaining < settings.DISCOVER_LOW_WATER_MARK:
+            self.redis.sadd(self.REFILL_KEY, user_id)
+
+        if not user_ids:
+            return []
+        profiles = (
+            db.query(Profile)
+            .filter(Profile.user_id.in_(user_ids), Profile.is_active == True)
+            .all()
+        )
+        profiles_by_user = {profile.user_id: profile for profile in profiles}
+        return [profiles_by_user[uid] for uid in user_ids if uid in profiles_by_user]
+
+    def refill(self, db: Session, user_id: str) -> int:
+        """Top up a user's queue to ``DISCOVER_QUEUE_SIZE``. Returns profiles added."""
+        lock_key = f"discover:refill:lock:{user_id}"
+        token = str(uuid.uuid4())
+        if not self.redis.set(lock_key, token, nx=True, ex=30):
+            return 0  # Another worker is already refilling this queue
+        try:
+            queue_key = self._queue_key(user_id)
+            queued = self.redis.lrange(queue_key, 0, -1)
+            needed = settings.DISCOVER_QUEUE_SIZE - len(queued)
+            if needed <= 0:
+                return 0
+
+            my_profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+            if not my_profile:
+                return 0
+
+            exclude = set(queued)
+            exclude.update(
+                self.redis.zrangebyscore(
+                    self._served_key(user_id),
+                    time.time() - settings.DISCOVER_SERVED_TTL_SECONDS,
+                    "+inf",
+                )
+            )
+            candidates = self._rank_candidates(db, my_profile, exclude, needed)
+            if candidates:
+                self.redis.rpush(queue_key, *candidates)
+            return len(candidates)
+        finally:
+            self._release(keys=[lock_key], args=[token])
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a queue whose filters no longer apply, e.g. after a preference change."""
+        self.redis.delete(self._queue_key(user_id))
+
+    def _rank_candidates(
+        self,
+        db: Session,
+        my_profile: Profile,
+        exclude: set,
+        limit: int,
+    ) -> List[str]:
+        """User IDs that pass both users' filters, nearest first."""
+        if not candidate_store.loaded:
+            candidate_store.refresh(db)
+
+        # Already swiped profiles are excluded in memory instead of NOT IN
+        swiped = SwipeBloomFilter(self.redis).load(db, my_profile.user_id)
+
+        return candidate_store.match(
+            my_profile,
+            self._get_position(my_profile),
+            limit,
+            exclude=lambda user_id: user_id in exclude or user_id in swiped,
+        )
+
+    def _get_position(self, profile: Profile) -> Optional[Tuple[float, float]]:
+        position = LocationBuffer(self.redis).latest(profile.user_id)
+        if position is None and profile.latitude is not None and profile.longitude is not None:
+            position = (profile.latitude, profile.longitude)
+        return position
+
+    async def run(self) -> None:
+        """Refill queues flagged by ``next_page`` until cancelled."""
+        while True:
+            await asyncio.sleep(settings.DISCOVER_REFILL_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(self.refill_pending)
+            except Exception as e:
+                logger.error(f"Discovery refill failed: {str(e)}", exc_info=True)
+
+    def refill_pending(self) -> int:
+        user_ids = self.redis.spop(self.REFILL_KEY, settings.DISCOVER_REFILL_BATCH_SIZE)
+        if not user_ids:
+            return 0
+        db = SessionLocal()
+        try:
+            for user_id in user_ids:
+                try:
+                    self.refill(db, user_id)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Refill failed for {user_id}: {str(e)}", exc_info=True)
+        finally:
+            db.close()
+        return len(user_ids)
+
+    def _queue_key(self, user_id: str) -> str:
+        return f"discover:queue:{user_id}"
+
+    def _served_key(self, user_id: str) -> str:
+        return f"discover:served_at:{user_id}"
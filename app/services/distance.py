@@ -0,0 +1,60 @@
+"""
+Batch distance kernel for nearby searches.
+
+Distances are computed for a whole candidate batch at once with the haversine
+formula on a spherical earth. Spherical distances can be off from the WGS-84
+ellipsoid by up to ~0.5%, so ``precise`` mode re-checks only the candidates
+that fall within that band around the radius with geopy's ``geodesic``.
+"""
+from typing import Sequence, Tuple
+import numpy as np
+from geopy.distance import geodesic
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Relative error bound of the spherical approximation vs the ellipsoid
+SPHERICAL_TOLERANCE = 0.006
+
+
+def haversine_km(
+    latitude: float,
+    longitude: float,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+) -> np.ndarray:
+    """Great-circle distances in km from one point to arrays of points."""
+    lat1 = np.radians(latitude)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlon = np.radians(longitudes) - np.radians(longitude)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def within_radius(
+    latitude: float,
+    longitude: float,
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    radius_km: float,
+    precise: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (indices, distances) of the points within ``radius_km``.
+
+    Indices refer to positions in the input sequences and are sorted by
+    ascending distance.
+    """
+    lats = np.asarray(latitudes, dtype=np.float64)
+    lons = np.asarray(longitudes, dtype=np.float64)
+    distances = haversine_km(latitude, longitude, lats, lons)
+
+    if precise:
+        band = radius_km * SPHERICAL_TOLERANCE
+        boundary = np.flatnonzero(np.abs(distances - radius_km) <= band)
+        for i in boundary:
+            distances[i] = geodesic((latitude, longitude), (lats[i], lons[i])).kilometers
+
+    indices = np.flatnonzero(distances <= radius_km)
+    indices = indices[np.argsort(distances[indices], kind="stable")]
+    return indices, distances[indices]
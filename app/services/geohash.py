@@ -0,0 +1,112 @@
+"""
+Geohash helpers used to bucket profile locations into grid cells.
+
+Profiles store a fixed precision geohash (see ``GEOHASH_PRECISION``) so that a
+radius search can be narrowed to the handful of cells around the user with
+indexed prefix lookups before the exact distance check.
+"""
+import math
+from typing import Set, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Precision stored on profiles.geohash (~153m x 153m cells)
+GEOHASH_PRECISION = 7
+
+# Upper bound on the number of cells used to cover a search radius
+MAX_COVERING_CELLS = 16
+
+_KM_PER_DEGREE_LAT = 111.32
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a coordinate pair into a geohash string."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """Return the (lat, lon) size in degrees of a cell at the given precision."""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float]:
+    """Return the (lat, lon) half-extent in degrees of a radius around a point."""
+    delta_lat = radius_km / _KM_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    delta_lon = min(radius_km / (_KM_PER_DEGREE_LAT * cos_lat), 180.0)
+    return delta_lat, delta_lon
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float) -> Set[str]:
+    """Return the geohash prefixes that together cover the given radius.
+
+    Picks the finest precision (up to ``GEOHASH_PRECISION``) whose cells cover
+    the radius' bounding box with at most ``MAX_COVERING_CELLS`` cells.
+    """
+    delta_lat, delta_lon = bounding_box(latitude, longitude, radius_km)
+    south = max(latitude - delta_lat, -90.0)
+    north = min(latitude + delta_lat, 90.0)
+
+    precision = 1
+    for candidate in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lon = cell_size(candidate)
+        rows = math.ceil((north - south) / cell_lat) + 1
+        cols = math.ceil(2 * delta_lon / cell_lon) + 1
+        if rows * cols <= MAX_COVERING_CELLS:
+            precision = candidate
+            break
+
+    cell_lat, cell_lon = cell_size(precision)
+    cells = set()
+    lat = south
+    while True:
+        lon = longitude - delta_lon
+        while True:
+            cells.add(encode(lat, _wrap_longitude(lon), precision))
+            if lon >= longitude + delta_lon:
+                break
+            lon = min(lon + cell_lon, longitude + delta_lon)
+        if lat >= north:
+            break
+        lat = min(lat + cell_lat, north)
+
+    return cells
+
+
+def _wrap_longitude(longitude: float) -> float:
+    return ((longitude + 180.0) % 360.0) - 180.0
@@ -0,0 +1,122 @@
+import time
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+from sqlalchemy import and_, exists
+from sqlalchemy.orm import Session, aliased
+from app.core.redis_client import redis_client
+from app.models.profile import Profile
+from app.models.swipe import Swipe
+
+
+def likes_received_key(user_id: str) -> str:
+    return f"likes:received:{user_id}"
+
+
+class LikesIndex:
+    """Pending inbound likes per user, newest first.
+
+    ``likes:received:{user_id}`` is a sorted set of likers scored by like
+    time. A liker stays in it until the user swipes back either way, so a
+    new match clears it too. Sets are built lazily from MySQL the first time
+    they are read and then only updated incrementally.
+    """
+
+    def __init__(self, client=redis_client):
+        self.redis = client
+
+    def record(self, swipes: Iterable[dict]) -> None:
+        """Apply newly stored swipes (results of ``SwipeService``)."""
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        for swipe in swipes:
+            # Swiping back answers their like
+            pipe.zrem(likes_received_key(swipe["swiper_id"]), swipe["swiped_id"])
+            if swipe["answered"]:
+                pipe.zrem(likes_received_key(swipe["swiped_id"]), swipe["swiper_id"])
+            elif swipe["is_like"]:
+                pipe.zadd(likes_received_key(swipe["swiped_id"]), {swipe["swiper_id"]: now}, nx=True)
+        pipe.execute()
+
+    def count(self, db: Session, user_id: str) -> int:
+        self.ensure_built(db, user_id)
+        return self.redis.zcard(likes_received_key(user_id))
+
+    def page(
+        self,
+        db: Session,
+        user_id: str,
+        limit: int,
+        before: Optional[str] = None,
+    ) -> List[dict]:
+        """Likers older than ``before`` (a liker's user ID), with profiles.
+
+        Raises ValueError if ``before`` is not in the user's likes.
+        """
+        self.ensure_built(db, user_id)
+        key = likes_received_key(user_id)
+
+        start = 0
+        if before is not None:
+            rank = self.redis.zrevrank(key, before)
+            if rank is None:
+                raise ValueError("Invalid cursor")
+            start = rank + 1
+        likes = self.redis.zrevrange(key, start, start + limit - 1, withscores=True)
+        if not likes:
+            return []
+
+        profiles = (
+            db.query(Profile)
+            .filter(Profile.user_id.in_([liker_id for liker_id, _ in likes]))
+            .all()
+        )
+        profiles_by_user = {profile.user_id: profile for profile in profiles}
+        return [
+            {
+                "user_id": liker_id,
+                "profile": profiles_by_user[liker_id],
+                "liked_at": datetime.fromtimestamp(score, timezone.utc),
+            }
+            for liker_id, score in likes
+            if liker_id in profiles_by_user
+        ]
+
+    def rebuild(self, db: Session, user_id: str) -> None:
+        """Load a user's unanswered likes from MySQL.
+
+        Existing members are kept, so likes still waiting in the swipe stream
+        are not lost.
+        """
+        answer = aliased(Swipe)
+        rows = (
+            db.query(Swipe.swiper_id, Swipe.created_at)
+            .filter(
+                Swipe.swiped_id == user_id,
+                Swipe.is_like == True,
+                ~exists().where(
+                    and_(answer.swiper_id == user_id, answer.swiped_id == Swipe.swiper_id)
+                ),
+            )
+            .all()
+        )
+
+        key = likes_received_key(user_id)
+        pipe = self.redis.pipeline()
+        if rows:
+            pipe.zadd(
+                key,
+                {
+                    row.swiper_id: row.created_at.replace(tzinfo=timezone.utc).timestamp()
+                    for row in rows
+                },
+                nx=True,
+            )
+        pipe.set(self._built_key(user_id), "1")
+        pipe.execute()
+
+    def ensure_built(self, db: Session, user_id: str) -> None:
+        if not self.redis.exists(self._built_key(user_id)):
+            self.rebuild(db, user_id)
+
+    def _built_key(self, user_id: str) -> str:
+        return f"likes:received:{user_id}:built"
@@ -0,0 +1,100 @@
+import time
+from typing import List, Optional, Tuple
+from app.core.config import settings
+from app.core.redis_client import redis_client
+
+
+class LiveLocationService:
+    """Redis GEO index of recently active users.
+
+    Members of a GEO set cannot expire individually, so a companion sorted set
+    keeps each user's last-seen timestamp. Stale members are filtered out of
+    search results and pruned from both sets.
+    """
+
+    GEO_KEY = "geo:live_users"
+    # Redis GEO rejects positions closer to the poles than this
+    MAX_GEO_LATITUDE = 85.05112878
+    SEEN_KEY = "geo:live_users:seen"
+    PRUNE_BATCH_SIZE = 1000
+
+    def __init__(self, client=redis_client):
+        self.redis = client
+        self.ttl_seconds = settings.LIVE_LOCATION_TTL_SECONDS
+
+    def update(self, user_id: str, latitude: float, longitude: float) -> None:
+        pipe = self.redis.pipeline()
+        if abs(latitude) <= self.MAX_GEO_LATITUDE:
+            pipe.geoadd(self.GEO_KEY, (longitude, latitude, user_id))
+            pipe.zadd(self.SEEN_KEY, {user_id: time.time()})
+        else:
+            # Not searchable live, rather than at a stale position
+            pipe.zrem(self.GEO_KEY, user_id)
+            pipe.zrem(self.SEEN_KEY, user_id)
+        pipe.setex(
+            f"user:location:{user_id}",
+            self.ttl_seconds,
+            f"{latitude},{longitude}",
+        )
+        pipe.execute()
+
+    def get_position(self, user_id: str) -> Optional[Tuple[float, float]]:
+        pipe = self.redis.pipeline()
+        pipe.geopos(self.GEO_KEY, user_id)
+        pipe.zscore(self.SEEN_KEY, user_id)
+        (position,), last_seen = pipe.execute()
+        if position is None or last_seen is None or self._is_stale(last_seen):
+            return None
+        longitude, latitude = position
+        return latitude, longitude
+
+    def search(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        exclude_user_id: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """Return (user_id, distance_km) pairs within the radius, nearest first."""
+        self.prune()
+        results = self.redis.geosearch(
+            self.GEO_KEY,
+            longitude=longitude,
+            latitude=latitude,
+            radius=radius_km,
+            unit="km",
+            sort="ASC",
+            withdist=True,
+        )
+        results = [
+            (member, distance)
+            for member, distance in results
+            if member != exclude_user_id
+        ]
+        if not results:
+            return []
+
+        # Drop members that expired since the last prune
+        last_seen = self.redis.zmscore(self.SEEN_KEY, [member for member, _ in results])
+        return [
+            (member, float(distance))
+            for (member, distance), seen in zip(results, last_seen)
+            if seen is not None and not self._is_stale(seen)
+        ]
+
+    def prune(self) -> int:
+        """Remove members that have not reported a location within the TTL."""
+        cutoff = time.time() - self.ttl_seconds
+        stale = self.redis.zrangebyscore(
+            self.SEEN_KEY, "-inf", cutoff, start=0, num=self.PRUNE_BATCH_SIZE
+        )
+        if not stale:
+            return 0
+        pipe = self.redis.pipeline()
+        pipe.zrem(self.GEO_KEY, *stale)
+        pipe.zrem(self.SEEN_KEY, *stale)
+        pipe.execute()
+        return len(stale)
+
+    def _is_stale(self, last_seen: float) -> bool:
+        return last_seen < time.time() - self.ttl_seconds
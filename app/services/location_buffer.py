@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from redis.exceptions import ResponseError
+from sqlalchemy import bindparam, update
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_client import redis_client
+from app.models.profile import Profile
+from app.services import geohash
+from app.services.distance import haversine_km
+from app.services.live_location_service import LiveLocationService
+
+logger = logging.getLogger(__name__)
+
+
+class LocationBuffer:
+    """Coalesces location updates in Redis and flushes them to MySQL in bulk.
+
+    Each accepted update overwrites the user's entry in a pending hash, so a
+    user reporting many times between flushes costs a single row update.
+    ``user:location:{id}`` always holds the latest accepted position and is
+    what readers should use instead of ``profiles.latitude/longitude``.
+    """
+
+    PENDING_KEY = "location:pending"
+    FLUSHING_PREFIX = "location:pending:flushing:"
+
+    def __init__(self, client=redis_client):
+        self.redis = client
+        self.live_locations = LiveLocationService(client)
+
+    def record(self, user_id: str, latitude: float, longitude: float) -> bool:
+        """Buffer a location update. Returns False if the move was too small."""
+        previous = self.latest(user_id)
+        if previous is not None:
+            moved_km = float(haversine_km(latitude, longitude, previous[0], previous[1]))
+            if moved_km * 1000 < settings.LOCATION_MIN_MOVE_METERS:
+                # Still counts as activity for the live index
+                self.live_locations.update(user_id, previous[0], previous[1])
+                return False
+
+        self.redis.hset(self.PENDING_KEY, user_id, f"{latitude},{longitude}")
+        self.live_locations.update(user_id, latitude, longitude)
+        return True
+
+    def latest(self, user_id: str) -> Optional[Tuple[float, float]]:
+        return self.latest_many([user_id]).get(user_id)
+
+    def latest_many(self, user_ids: List[str]) -> Dict[str, Tuple[float, float]]:
+        if not user_ids:
+            return {}
+        values = self.redis.mget([f"user:location:{user_id}" for user_id in user_ids])
+        return {
+            user_id: _parse_position(value)
+            for user_id, value in zip(user_ids, values)
+            if value is not None
+        }
+
+    def discard(self, user_id: str) -> None:
+        """Drop a pending update, e.g. after the location was written directly."""
+        self.redis.hdel(self.PENDING_KEY, user_id)
+
+    def flush(self) -> int:
+        """Write all pending updates to the profiles table. Returns rows flushed."""
+        # Claim the current batch atomically so concurrent flushers don't overlap;
+        # the claim time lets recover() tell a dead flusher's batch from a live one
+        processing_key = f"{self.FLUSHING_PREFIX}{int(time.time())}:{uuid.uuid4()}"
+        try:
+            self.redis.rename(self.PENDING_KEY, processing_key)
+        except ResponseError:
+            return 0  # Nothing pending
+
+        pending = self.redis.hgetall(processing_key)
+        rows = []
+        for user_id, value in pending.items():
+            latitude, longitude = _parse_position(value)
+            rows.append(
+                {
+                    "b_user_id": user_id,
+                    "b_latitude": latitude,
+                    "b_longitude": longitude,
+                    "b_geohash": geohash.encode(latitude, longitude),
+                }
+            )
+
+        profiles = Profile.__table__
+        stmt = (
+            update(profiles)
+            .where(profiles.c.user_id == bindparam("b_user_id"))
+            .values(
+                latitude=bindparam("b_latitude"),
+                longitude=bindparam("b_longitude"),
+                geohash=bindparam("b_geohash"),
+            )
+        )
+
+        db = SessionLocal()
+        try:
+            batch_size = settings.LOCATION_FLUSH_BATCH_SIZE
+            for start in range(0, len(rows), batch_size):
+                db.execute(stmt, rows[start:start + batch_size])
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the batch back without overwriting newer updates
+            pipe = self.redis.pipeline()
+            for user_id, value in pending.items():
+                pipe.hsetnx(self.PENDING_KEY, user_id, value)
+            pipe.delete(processing_key)
+            pipe.execute()
+            raise
+        finally:
+            db.close()
+
+        self.redis.delete(processing_key)
+        return len(rows)
+
+    def recover(self) -> int:
+        """Put back batches claimed by flushers that died. Returns batches recovered."""
+        cutoff = time.time() - settings.LOCATION_FLUSH_ORPHAN_SECONDS
+        recovered = 0
+        for key in self.redis.scan_iter(match=f"{self.FLUSHING_PREFIX}*"):
+            claimed_at = key[len(self.FLUSHING_PREFIX):].partition(":")[0]
+            if claimed_at.isdigit() and int(claimed_at) > cutoff:
+                continue  # Probably still being flushed
+            pending = self.redis.hgetall(key)
+            pipe = self.redis.pipeline()
+            # Newer updates for the same users win
+            for user_id, value in pending.items():
+                pipe.hsetnx(self.PENDING_KEY, user_id, value)
+            pipe.delete(key)
+            pipe.execute()
+            recovered += 1
+        return recovered
+
+    async def run(self) -> None:
+        """Flush pending updates periodically until cancelled."""
+        try:
+            recovered = await asyncio.to_thread(self.recover)
+            if recovered:
+                logger.info(f"Recovered {recovered} orphaned location batches")
+        except Exception as e:
+            logger.error(f"Location batch recovery failed: {str(e)}", exc_info=True)
+        while True:
+            await asyncio.sleep(settings.LOCATION_FLUSH_INTERVAL_SECONDS)
+            try:
+                flushed = await asyncio.to_thread(self.flush)
+                if flushed:
+                    logger.info(f"Flushed {flushed} buffered location updates")
+            except Exception as e:
+                logger.error(f"Location flush failed: {str(e)}", exc_info=True)
+
+
+def _parse_position(value: str) -> Tuple[float, float]:
+    # Pending values may still carry a trailing recorded-at time
+    latitude, longitude = value.split(",")[:2]
+    return float(latitude), float(longitude)
@@ -1,9 +1,16 @@
+import base64
+import binascii
+import math
+import numpy as np
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from geopy.distance import geodesic
-from typing import List
+from typing import List, Optional, Tuple
+from app.core.config import settings
 from app.models.profile import Profile
 from app.schemas.nearby import NearbyUserResponse
 from app.schemas.profile import ProfileResponse
+from app.services import geohash
+from app.services.distance import haversine_km, within_radius
 
 
 class LocationService:
@@ -15,35 +22,209 @@ class LocationService:
         radius_km: int,
         exclude_user_id: str,
     ) -> List[NearbyUserResponse]:
-        # Get all active profiles with location
-        profiles = (
-            db.query(Profile)
+        # Only load coordinates for profiles in the cells covering the radius
+        cells = geohash.covering_cells(latitude, longitude, radius_km)
+        candidates = (
+            db.query(Profile.id, Profile.latitude, Profile.longitude)
             .filter(
                 Profile.user_id != exclude_user_id,
                 Profile.is_active == True,
                 Profile.latitude.isnot(None),
                 Profile.longitude.isnot(None),
+                or_(*[Profile.geohash.like(f"{cell}%") for cell in cells]),
             )
             .all()
         )
+        if not candidates:
+            return []
+        
+        # Exact distance check for the whole batch at once
+        indices, distances = within_radius(
+            latitude,
+            longitude,
+            [row.latitude for row in candidates],
+            [row.longitude for row in candidates],
+            radius_km,
+            precise=settings.NEARBY_PRECISE_DISTANCE,
+        )
+        if len(indices) == 0:
+            return []
+        
+        # Load full profiles only for the users within the radius
+        profile_ids = [candidates[i].id for i in indices]
+        profiles = db.query(Profile).filter(Profile.id.in_(profile_ids)).all()
+        profiles_by_id = {profile.id: profile for profile in profiles}
         
         nearby_users = []
-        user_location = (latitude, longitude)
+        for profile_id, distance in zip(profile_ids, distances):
+            profile = profiles_by_id.get(profile_id)
+            if profile is None:
+                continue
+            nearby_users.append(
+                NearbyUserResponse(
+                    user_id=str(profile.user_id),
+                    profile=ProfileResponse.from_orm(profile),
+                    distance_km=round(float(distance), 2),
+                )
+            )
         
-        for profile in profiles:
-            profile_location = (profile.latitude, profile.longitude)
-            distance = geodesic(user_location, profile_location).kilometers
-            
-            if distance <= radius_km:
-                nearby_users.append(
-                    NearbyUserResponse(
-                        user_id=str(profile.user_id),
-                        profile=ProfileResponse.from_orm(profile),
-                        distance_km=round(distance, 2),
+        # Already sorted by distance
+        return nearby_users
+
+    def find_live_nearby_users(
+        self,
+        db: Session,
+        live_users: List[Tuple[str, float]],
+    ) -> List[NearbyUserResponse]:
+        """Hydrate (user_id, distance_km) results from the live location index."""
+        return self._build_responses(db, live_users)
+    
+    def find_nearest_users(
+        self,
+        db: Session,
+        latitude: float,
+        longitude: float,
+        radius_km: int,
+        limit: int,
+        exclude_user_id: str,
+        after: Optional[Tuple[float, str]] = None,
+    ) -> Tuple[List[NearbyUserResponse], Optional[str]]:
+        """Return the ``limit`` closest users within the radius and a next-page cursor.
+        
+        Searches outward in rings of doubling radius and stops at the first
+        ring that already holds enough users, so dense areas only load the
+        cells right around the user. ``after`` is a decoded (distance_km,
+        user_id) cursor; only users ordered after it are returned.
+        """
+        after_distance, after_user_id = after if after else (0.0, "")
+        ring_km = min(after_distance + settings.NEARBY_INITIAL_RING_KM, radius_km)
+        # Cells cover whole discs, so later pages leave out the users of
+        # earlier ones in SQL: the square inscribed in the cursor's disc
+        # (shrunk to allow for longitude distortion) holds only closer users
+        closer = []
+        if after_distance > 0:
+            inner_lat, inner_lon = geohash.bounding_box(latitude, longitude, after_distance / 2)
+            closer = [
+                ~and_(
+                    Profile.latitude.between(latitude - inner_lat, latitude + inner_lat),
+                    Profile.longitude.between(longitude - inner_lon, longitude + inner_lon),
+                )
+            ]
+        
+        queried_cells = set()
+        candidates = {}  # profile id -> (user_id, latitude, longitude)
+        
+        while True:
+            cells = [
+                cell
+                for cell in geohash.covering_cells(latitude, longitude, ring_km)
+                if not any(cell.startswith(queried) for queried in queried_cells)
+            ]
+            if cells:
+                rows = (
+                    db.query(Profile.id, Profile.user_id, Profile.latitude, Profile.longitude)
+                    .filter(
+                        Profile.user_id != exclude_user_id,
+                        Profile.is_active == True,
+                        Profile.latitude.isnot(None),
+                        Profile.longitude.isnot(None),
+                        or_(*[Profile.geohash.like(f"{cell}%") for cell in cells]),
+                        *closer,
                     )
+                    .all()
                 )
+                for row in rows:
+                    candidates[row.id] = (row.user_id, row.latitude, row.longitude)
+                queried_cells.update(cells)
+            
+            found = self._rank_after(latitude, longitude, candidates, ring_km, after)
+            # One extra result tells us whether there is a next page
+            if len(found) > limit or ring_km >= radius_km:
+                break
+            ring_km = min(ring_km * 2, radius_km)
+        
+        page = found[:limit]
+        next_cursor = None
+        if len(found) > limit:
+            last_user_id, last_distance = page[-1]
+            next_cursor = encode_cursor(last_distance, last_user_id)
+        
+        return self._build_responses(db, page), next_cursor
+    
+    def _rank_after(
+        self,
+        latitude: float,
+        longitude: float,
+        candidates: dict,
+        radius_km: float,
+        after: Optional[Tuple[float, str]],
+    ) -> List[Tuple[str, float]]:
+        """(user_id, distance_km) within the radius ordered by (distance, user_id)."""
+        if not candidates:
+            return []
+        user_ids, latitudes, longitudes = zip(*candidates.values())
+        distances = haversine_km(
+            latitude,
+            longitude,
+            np.asarray(latitudes, dtype=np.float64),
+            np.asarray(longitudes, dtype=np.float64),
+        )
+        
+        indices = np.flatnonzero(distances <= radius_km)
+        ranked = sorted(
+            (float(distances[i]), user_ids[i]) for i in indices
+        )
+        if after:
+            ranked = [item for item in ranked if item > after]
+        return [(user_id, distance) for distance, user_id in ranked]
+    
+    def _build_responses(
+        self,
+        db: Session,
+        results: List[Tuple[str, float]],
+    ) -> List[NearbyUserResponse]:
+        """Load profiles for (user_id, distance_km) pairs, keeping their order."""
+        if not results:
+            return []
         
-        # Sort by distance
-        nearby_users.sort(key=lambda x: x.distance_km)
+        user_ids = [user_id for user_id, _ in results]
+        profiles = (
+            db.query(Profile)
+            .filter(Profile.user_id.in_(user_ids), Profile.is_active == True)
+            .all()
+        )
+        profiles_by_user = {profile.user_id: profile for profile in profiles}
+        
+        nearby_users = []
+        for user_id, distance in results:
+            profile = profiles_by_user.get(user_id)
+            if profile is None:
+                continue
+            nearby_users.append(
+                NearbyUserResponse(
+                    user_id=str(user_id),
+                    profile=ProfileResponse.from_orm(profile),
+                    distance_km=round(distance, 2),
+                )
+            )
         return nearby_users
 
+
+def encode_cursor(distance_km: float, user_id: str) -> str:
+    raw = f"{distance_km!r}:{user_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Decode a nearest-users cursor. Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    except (binascii.Error, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    distance, separator, user_id = raw.partition(":")
+    if not separator or not user_id:
+        raise ValueError("Invalid cursor")
+    distance = float(distance)
+    if not math.isfinite(distance) or distance < 0:
+        raise ValueError("Invalid cursor")
+    return distance, user_id
@@ -0,0 +1,94 @@
+from typing import Iterable, List
+from pydantic import TypeAdapter
+from sqlalchemy import case, or_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.redis_client import redis_binary_client
+from app.models.swipe import Match
+from app.schemas.swipe import MatchResponse
+
+_match_list = TypeAdapter(List[MatchResponse])
+
+# Only store the page if no invalidation happened since it was read from MySQL
+_SET_IF_CURRENT_SCRIPT = """
+local generation = redis.call('GET', KEYS[2]) or ''
+if generation ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+
+class MatchCache:
+    """Serialized first pages of ``GET /swipe/matches`` per user.
+
+    Pages with last-message previews are kept under a separate key so chat
+    traffic only invalidates those. Every invalidation bumps a generation
+    counter, which stops a reader that loaded from MySQL before the change
+    from caching its stale page afterwards.
+    """
+
+    def __init__(self, client=redis_binary_client):
+        self.redis = client
+        self._set_if_current = self.redis.register_script(_SET_IF_CURRENT_SCRIPT)
+
+    def get(self, user_id: str, limit: int, include_last_message: bool):
+        """Return (cached JSON bytes or None, generation to pass to ``set``)."""
+        pipe = self.redis.pipeline()
+        pipe.hget(self._key(user_id, include_last_message), str(limit))
+        pipe.get(self._generation_key(user_id))
+        body, generation = pipe.execute()
+        return body, generation or b""
+
+    def set(
+        self,
+        user_id: str,
+        limit: int,
+        include_last_message: bool,
+        body: bytes,
+        generation: bytes,
+    ) -> None:
+        self._set_if_current(
+            keys=[self._key(user_id, include_last_message), self._generation_key(user_id)],
+            args=[generation, str(limit), body, settings.MATCH_CACHE_TTL_SECONDS],
+        )
+
+    def serialize(self, matches: List[dict]) -> bytes:
+        return _match_list.dump_json(
+            _match_list.validate_python(matches, from_attributes=True)
+        )
+
+    def invalidate(self, user_ids: Iterable[str], previews_only: bool = False) -> None:
+        pipe = self.redis.pipeline()
+        for user_id in set(user_ids):
+            pipe.delete(self._key(user_id, True))
+            if not previews_only:
+                pipe.delete(self._key(user_id, False))
+            generation_key = self._generation_key(user_id)
+            pipe.incr(generation_key)
+            pipe.expire(generation_key, settings.MATCH_CACHE_TTL_SECONDS * 2)
+        pipe.execute()
+
+    def invalidate_profile(self, db: Session, user_id: str) -> None:
+        """Drop the lists of everyone matched with a user whose profile changed."""
+        other_user_id = case(
+            (Match.user1_id == user_id, Match.user2_id),
+            else_=Match.user1_id,
+        )
+        rows = (
+            db.query(other_user_id)
+            .filter(or_(Match.user1_id == user_id, Match.user2_id == user_id))
+            .all()
+        )
+        user_ids = [row[0] for row in rows]
+        if user_ids:
+            self.invalidate(user_ids)
+
+    def _key(self, user_id: str, include_last_message: bool) -> str:
+        suffix = ":previews" if include_last_message else ""
+        return f"matches:cache:{user_id}{suffix}"
+
+    def _generation_key(self, user_id: str) -> str:
+        return f"matches:cache:{user_id}:generation"
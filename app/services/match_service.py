@@ -0,0 +1,96 @@
+from typing import List, Optional
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session
+from app.models.chat import ChatMessage
+from app.models.profile import Profile
+from app.models.swipe import Match
+
+
+class MatchService:
+    def list_matches(
+        self,
+        db: Session,
+        user_id: str,
+        limit: int,
+        before: Optional[str] = None,
+        include_last_message: bool = False,
+    ) -> List[dict]:
+        """A page of the user's matches, newest first, with the other user's profile.
+
+        ``before`` is the ID of the last match of the previous page. Raises
+        ValueError if it isn't one of the user's matches.
+        """
+        other_user_id = case(
+            (Match.user1_id == user_id, Match.user2_id),
+            else_=Match.user1_id,
+        )
+        query = (
+            db.query(Match, Profile)
+            .join(Profile, Profile.user_id == other_user_id)
+            .filter(or_(Match.user1_id == user_id, Match.user2_id == user_id))
+        )
+
+        if before:
+            cursor = (
+                db.query(Match.created_at, Match.id)
+                .filter(
+                    Match.id == before,
+                    or_(Match.user1_id == user_id, Match.user2_id == user_id),
+                )
+                .first()
+            )
+            if cursor is None:
+                raise ValueError("Invalid cursor")
+            query = query.filter(
+                or_(
+                    Match.created_at < cursor.created_at,
+                    and_(Match.created_at == cursor.created_at, Match.id < cursor.id),
+                )
+            )
+
+        rows = (
+            query.order_by(Match.created_at.desc(), Match.id.desc())
+            .limit(limit)
+            .all()
+        )
+
+        last_messages = {}
+        if include_last_message and rows:
+            last_messages = self._last_messages(db, [match.id for match, _ in rows])
+
+        return [
+            {
+                "match_id": str(match.id),
+                "user_id": str(profile.user_id),
+                "profile": profile,
+                "created_at": match.created_at,
+                "last_message": last_messages.get(match.id),
+            }
+            for match, profile in rows
+        ]
+
+    def _last_messages(self, db: Session, match_ids: List[str]) -> dict:
+        """Latest message per match, in one query."""
+        latest = (
+            db.query(
+                ChatMessage.match_id,
+                func.max(ChatMessage.created_at).label("created_at"),
+            )
+            .filter(ChatMessage.match_id.in_(match_ids))
+            .group_by(ChatMessage.match_id)
+            .subquery()
+        )
+        messages = (
+            db.query(ChatMessage)
+            .join(
+                latest,
+                and_(
+                    ChatMessage.match_id == latest.c.match_id,
+                    ChatMessage.created_at == latest.c.created_at,
+                ),
+            )
+            .order_by(ChatMessage.id)
+            .all()
+        )
+        # On timestamp ties the highest ID wins
+        return {message.match_id: message for message in messages}
@@ -0,0 +1,136 @@
+from datetime import timezone
+from typing import Optional
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.redis_client import redis_binary_client
+from app.schemas.chat import ChatMessageResponse
+from app.schemas.chat_room import ChatRoomMessageResponse
+from app.schemas.nearby import NearbyChatMessageResponse
+from app.services.chat_history import (
+    MATCH_MESSAGES,
+    MESSAGE_KINDS,
+    NEARBY_MESSAGES,
+    ROOM_MESSAGES,
+    paginate_messages,
+)
+
+_ADAPTERS = {
+    MATCH_MESSAGES: TypeAdapter(ChatMessageResponse),
+    ROOM_MESSAGES: TypeAdapter(ChatRoomMessageResponse),
+    NEARBY_MESSAGES: TypeAdapter(NearbyChatMessageResponse),
+}
+
+# Only buffer onto a warm set; otherwise bump the generation so an
+# in-flight warm-up from MySQL doesn't install a set missing this message
+_APPEND_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -ARGV[3] - 1)
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    redis.call('EXPIRE', KEYS[2], ARGV[4])
+else
+    redis.call('INCR', KEYS[3])
+    redis.call('EXPIRE', KEYS[3], ARGV[4])
+end
+return 1
+"""
+
+_WARM_SCRIPT = """
+local generation = redis.call('GET', KEYS[3]) or ''
+if generation ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+if #ARGV > 2 then
+    redis.call('ZADD', KEYS[1], unpack(ARGV, 3))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SET', KEYS[2], '1', 'EX', ARGV[2])
+return 1
+"""
+
+
+class MessageBuffer:
+    """The last ``CHAT_RECENT_MESSAGES`` serialized messages per conversation.
+
+    ``chat:latest:{kind}:{id}`` is a Redis sorted set holding each message
+    as the JSON its history endpoint returns, prefixed with its ID and a
+    newline and scored by its timestamp, so it sorts like the conversation
+    pages in MySQL: by ``(created_at, id)``, whatever order messages are
+    written in. A ``:warm`` marker means the set mirrors the conversation's
+    latest messages; it is set when the set is loaded from MySQL on the
+    first read and kept current by ``append`` as messages are written, so it
+    never runs ahead of MySQL.
+    """
+
+    def __init__(self, client=redis_binary_client):
+        self.redis = client
+        self._append = self.redis.register_script(_APPEND_SCRIPT)
+        self._warm = self.redis.register_script(_WARM_SCRIPT)
+
+    def append(self, kind: str, conversation_id: str, message) -> None:
+        self._append(
+            keys=self._keys(kind, conversation_id),
+            args=[
+                *self._entry(kind, message),
+                settings.CHAT_RECENT_MESSAGES,
+                settings.CHAT_RECENT_TTL_SECONDS,
+            ],
+        )
+
+    def latest(self, db: Session, kind: str, conversation_id: str, limit: int) -> Optional[bytes]:
+        """JSON array of the latest ``limit`` messages, oldest first.
+
+        Returns None when ``limit`` exceeds what the buffer holds, in which
+        case the caller reads MySQL.
+        """
+        if limit > settings.CHAT_RECENT_MESSAGES:
+            return None
+        key, warm_key, generation_key = self._keys(kind, conversation_id)
+
+        pipe = self.redis.pipeline()
+        pipe.exists(warm_key)
+        pipe.zrevrange(key, 0, limit - 1)
+        pipe.get(generation_key)
+        warm, members, generation = pipe.execute()
+        bodies = [member.partition(b"\n")[2] for member in members]
+
+        if not warm:
+            model, column = MESSAGE_KINDS[kind]
+            messages = paginate_messages(
+                db,
+                model,
+                getattr(model, column),
+                conversation_id,
+                settings.CHAT_RECENT_MESSAGES,
+            )
+            entries = [self._entry(kind, message) for message in messages]
+            self._warm(
+                keys=[key, warm_key, generation_key],
+                args=[
+                    generation or b"",
+                    settings.CHAT_RECENT_TTL_SECONDS,
+                    *(value for entry in entries for value in entry),
+                ],
+            )
+            bodies = [member.partition(b"\n")[2] for _, member in reversed(entries[-limit:])]
+
+        return b"[" + b",".join(reversed(bodies)) + b"]"
+
+    def serialize(self, kind: str, message) -> bytes:
+        adapter = _ADAPTERS[kind]
+        return adapter.dump_json(adapter.validate_python(message, from_attributes=True))
+
+    def _entry(self, kind: str, message):
+        """The message's score and member in the sorted set."""
+        if isinstance(message, dict):
+            message_id, created_at = message["id"], message["created_at"]
+        else:
+            message_id, created_at = message.id, message.created_at
+        score = created_at.replace(tzinfo=timezone.utc).timestamp()
+        return score, message_id.encode() + b"\n" + self.serialize(kind, message)
+
+    def _keys(self, kind: str, conversation_id: str):
+        key = f"chat:latest:{kind}:{conversation_id}"
+        return [key, f"{key}:warm", f"{key}:generation"]
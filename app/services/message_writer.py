@@ -0,0 +1,169 @@
+import asyncio
+import logging
+from typing import Iterable, List, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.chat_history import MESSAGE_KINDS
+from app.services.match_cache import MatchCache
+from app.services.message_buffer import MessageBuffer
+
+logger = logging.getLogger(__name__)
+
+# (kind, message row, users whose match list previews it changes)
+QueuedMessage = Tuple[str, dict, Tuple[str, ...]]
+
+# MySQL being unavailable (lost connection, deadlock, lock wait timeout):
+# nothing is wrong with the messages, so they are retried, not dropped
+_TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+_DUPLICATE_KEY = 1062
+
+
+class WriterBusyError(Exception):
+    pass
+
+
+class MessageWriter:
+    """Write-behind persistence for chat messages.
+
+    Senders get their message back as soon as it is queued; ``run`` writes
+    the queue to the message tables with one multi-row INSERT per table,
+    once ``CHAT_WRITE_BATCH_SIZE`` messages are waiting or
+    ``CHAT_WRITE_FLUSH_INTERVAL_SECONDS`` after the first one arrived. The
+    queue is bounded: when MySQL falls behind, ``submit`` waits up to
+    ``CHAT_WRITE_ENQUEUE_TIMEOUT_SECONDS`` and then fails. While MySQL is
+    unavailable the batch being written is retried with backoff and the
+    queue is not drained, so senders get that backpressure instead of their
+    messages being dropped; only rows MySQL rejects are. Side effects that
+    must not run ahead of MySQL (the recent-message buffer and match list
+    previews) are applied after each commit.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.CHAT_WRITE_QUEUE_SIZE)
+        self._closed = False
+        self._in_flight: List[QueuedMessage] = []
+
+    async def submit(self, kind: str, message: dict, participant_ids: Iterable[str] = ()) -> None:
+        if self._closed:
+            raise WriterBusyError()  # Shutting down; it would never be written
+        try:
+            await asyncio.wait_for(
+                self._queue.put((kind, message, tuple(participant_ids))),
+                timeout=settings.CHAT_WRITE_ENQUEUE_TIMEOUT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            raise WriterBusyError()
+
+    async def close(self) -> None:
+        """Stop accepting messages and ask ``run`` to write what is queued and return."""
+        self._closed = True
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass  # run() isn't waiting, and returns once it has drained the queue
+
+    def discard(self) -> int:
+        """Drop what was never written, once ``run`` has stopped; returns how many messages."""
+        dropped = len(self._in_flight)
+        self._in_flight = []
+        while not self._queue.empty():
+            if self._queue.get_nowait() is not None:
+                dropped += 1
+        return dropped
+
+    async def run(self) -> None:
+        """Write queued messages in batches until ``close`` is called."""
+        while True:
+            batch = [await self._queue.get()]
+            if batch[0] is not None and self._queue.qsize() < settings.CHAT_WRITE_BATCH_SIZE - 1:
+                # Give a burst a moment to accumulate into one INSERT
+                await asyncio.sleep(settings.CHAT_WRITE_FLUSH_INTERVAL_SECONDS)
+            while len(batch) < settings.CHAT_WRITE_BATCH_SIZE and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            self._in_flight = [item for item in batch if item is not None]
+            delay = settings.CHAT_WRITE_RETRY_INITIAL_SECONDS
+            while self._in_flight:
+                self._in_flight = await asyncio.to_thread(self.write, self._in_flight)
+                if self._in_flight:
+                    # Stay on this batch; the queue backs up meanwhile
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, settings.CHAT_WRITE_RETRY_MAX_SECONDS)
+            # Senders already waiting when close() was called are written too
+            if self._closed and self._queue.empty():
+                return
+
+    def write(self, messages: List[QueuedMessage]) -> List[QueuedMessage]:
+        """Write messages; returns those to retry because MySQL is unavailable."""
+        pending = []
+        try:
+            self._insert(messages)
+            written = messages
+        except _TRANSIENT_ERRORS as e:
+            logger.error(f"Message write failed, will retry: {str(e)}")
+            return messages
+        except Exception as e:
+            # One bad row (e.g. a deleted room) must not drop the whole batch
+            logger.error(f"Batched message write failed, retrying one by one: {str(e)}")
+            written = []
+            for i, message in enumerate(messages):
+                try:
+                    self._insert([message])
+                    written.append(message)
+                except _TRANSIENT_ERRORS as e:
+                    logger.error(f"Message write failed, will retry: {str(e)}")
+                    pending = messages[i:]
+                    break
+                except IntegrityError as e:
+                    if _error_code(e) == _DUPLICATE_KEY:
+                        # Written by an attempt whose commit looked like it failed
+                        written.append(message)
+                    else:
+                        logger.error(f"Dropping message {message[1]['id']}: {str(e)}")
+                except Exception as e:
+                    logger.error(f"Dropping message {message[1]['id']}: {str(e)}", exc_info=True)
+
+        try:
+            self._after_commit(written)
+        except Exception as e:
+            logger.error(f"Post-write updates failed: {str(e)}", exc_info=True)
+        return pending
+
+    def _insert(self, messages: List[QueuedMessage]) -> None:
+        rows_by_kind = {}
+        for kind, message, _ in messages:
+            rows_by_kind.setdefault(kind, []).append(message)
+
+        db = SessionLocal()
+        try:
+            for kind, rows in rows_by_kind.items():
+                model, _ = MESSAGE_KINDS[kind]
+                db.execute(insert(model), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _after_commit(self, messages: List[QueuedMessage]) -> None:
+        buffer = MessageBuffer()
+        participant_ids = set()
+        for kind, message, participants in messages:
+            _, column = MESSAGE_KINDS[kind]
+            buffer.append(kind, message[column], message)
+            participant_ids.update(participants)
+
+        # Last-message previews in these users' match lists are now stale
+        if participant_ids:
+            MatchCache().invalidate(participant_ids, previews_only=True)
+
+
+def _error_code(error: IntegrityError):
+    args = getattr(error.orig, "args", None)
+    return args[0] if args else None
+
+
+message_writer = MessageWriter()
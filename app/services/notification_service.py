@@ -0,0 +1,98 @@
+import json
+from typing import Iterable, List, Optional
+from pydantic import TypeAdapter
+from redis.exceptions import ResponseError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.redis_client import redis_async_client, redis_client
+from app.models.profile import Profile
+from app.models.swipe import Match
+from app.schemas.swipe import MatchResponse
+from app.websocket.chat_websocket import USER_CHANNEL, ConnectionManager, channel_name
+
+_match_response = TypeAdapter(MatchResponse)
+
+# Record the event, then publish it with its stream ID so clients can
+# resume from the last event they saw
+_NOTIFY_SCRIPT = """
+local id = redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[1], '*', 'data', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('PUBLISH', KEYS[2], '{"id":"' .. id .. '",' .. string.sub(ARGV[2], 2))
+return id
+"""
+
+
+class NotificationService:
+    """Events pushed to a user's live connections on ``user:{user_id}``.
+
+    Every event is also appended to the capped ``events:{user_id}`` stream,
+    so a client reconnecting to ``/ws/stream?since={id}`` receives what it
+    missed instead of reloading everything.
+    """
+
+    def __init__(self, client=redis_client, async_client=redis_async_client):
+        self.redis = client
+        self.async_redis = async_client
+        self._notify = self.redis.register_script(_NOTIFY_SCRIPT)
+
+    def notify(self, user_id: str, event: dict) -> str:
+        return self._notify(
+            keys=[
+                self._events_key(user_id),
+                ConnectionManager.PUBSUB_PREFIX + channel_name(USER_CHANNEL, user_id),
+            ],
+            args=[
+                settings.MISSED_EVENTS_MAXLEN,
+                json.dumps(event, separators=(",", ":")),
+                settings.MISSED_EVENTS_TTL_SECONDS,
+            ],
+        )
+
+    def notify_matches(self, db: Session, match_ids: Iterable[str]) -> None:
+        """Send each new match to both users, rendered as ``GET /swipe/matches`` would."""
+        matches = db.query(Match).filter(Match.id.in_(list(match_ids))).all()
+        if not matches:
+            return
+        user_ids = {user_id for match in matches for user_id in (match.user1_id, match.user2_id)}
+        profiles = {
+            profile.user_id: profile
+            for profile in db.query(Profile).filter(Profile.user_id.in_(user_ids)).all()
+        }
+
+        for match in matches:
+            for user_id, other_user_id in (
+                (match.user1_id, match.user2_id),
+                (match.user2_id, match.user1_id),
+            ):
+                profile = profiles.get(other_user_id)
+                if profile is None:
+                    continue
+                rendered = _match_response.validate_python(
+                    {
+                        "match_id": match.id,
+                        "user_id": other_user_id,
+                        "profile": profile,
+                        "created_at": match.created_at,
+                    },
+                    from_attributes=True,
+                )
+                self.notify(
+                    user_id,
+                    {"event": "match", "match": _match_response.dump_python(rendered, mode="json")},
+                )
+
+    async def missed(self, user_id: str, since: Optional[str]) -> List[str]:
+        """Events after ``since`` (an event ID), oldest first, as JSON."""
+        if not since:
+            return []
+        try:
+            entries = await self.async_redis.xrange(self._events_key(user_id), min=f"({since}")
+        except ResponseError:
+            return []  # Malformed ID
+        return [
+            f'{{"id":"{entry_id.decode()}",{fields[b"data"].decode()[1:]}'
+            for entry_id, fields in entries
+        ]
+
+    def _events_key(self, user_id: str) -> str:
+        return f"events:{user_id}"
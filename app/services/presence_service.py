@@ -0,0 +1,262 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+from app.core.config import settings
+from app.core.redis_client import redis_async_client
+from app.services.chat_history import MATCH_MESSAGES, ROOM_MESSAGES
+from app.websocket.chat_websocket import Connection, ConnectionManager, event_message, manager
+
+logger = logging.getLogger(__name__)
+
+# Conversations whose members see each other's presence and typing
+PRESENCE_KINDS = (MATCH_MESSAGES, ROOM_MESSAGES)
+
+# Per-user cap on the presence and typing events a user causes, per minute
+_RATE_LIMIT = """
+local function allowed(key, limit)
+    local count = redis.call('INCR', key)
+    if count == 1 then
+        redis.call('EXPIRE', key, 60)
+    end
+    return count <= tonumber(limit)
+end
+"""
+
+# Members and connections are scored by when they expire, so stale ones
+# drop out of reads, and connections of a crashed worker stop counting,
+# even if nobody removes them
+_JOIN_SCRIPT = _RATE_LIMIT + """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[1], ARGV[2] + ARGV[3], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('ZADD', KEYS[5], ARGV[2] + ARGV[3], ARGV[6])
+redis.call('EXPIRE', KEYS[5], ARGV[3])
+if (not score or tonumber(score) < tonumber(ARGV[2])) and allowed(KEYS[3], ARGV[4]) then
+    redis.call('PUBLISH', KEYS[4], ARGV[5])
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[2])
+return {redis.call('ZRANGE', KEYS[1], 0, -1), redis.call('ZRANGE', KEYS[2], 0, -1)}
+"""
+
+# The user stays in the conversation while any of their connections,
+# on any worker, still is
+_LEAVE_SCRIPT = _RATE_LIMIT + """
+redis.call('ZREM', KEYS[5], ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[5], '-inf', ARGV[5])
+if redis.call('ZCARD', KEYS[5]) > 0 then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 1 and allowed(KEYS[3], ARGV[2]) then
+    redis.call('PUBLISH', KEYS[4], ARGV[3])
+end
+"""
+
+_DISCONNECT_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    redis.call('DEL', KEYS[1], KEYS[2])
+end
+"""
+
+# Starting is debounced: while the user is marked as typing, repeats are
+# absorbed here instead of being fanned out
+_TYPING_SCRIPT = _RATE_LIMIT + """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+local typing = score and tonumber(score) > tonumber(ARGV[2])
+if ARGV[6] == '1' then
+    if typing or not allowed(KEYS[2], ARGV[4]) then
+        return 0
+    end
+    redis.call('ZADD', KEYS[1], ARGV[2] + ARGV[3], ARGV[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+else
+    if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 or not typing then
+        return 0
+    end
+end
+redis.call('PUBLISH', KEYS[3], ARGV[5])
+return 1
+"""
+
+
+class PresenceService:
+    """Online and typing state in Redis, counted per connection across workers.
+
+    Marks expire unless ``run`` refreshes them every ``PRESENCE_REFRESH_SECONDS``.
+    """
+
+    def __init__(self, client=redis_async_client, connections=manager):
+        self.redis = client
+        self.connections = connections
+        self._join = self.redis.register_script(_JOIN_SCRIPT)
+        self._leave = self.redis.register_script(_LEAVE_SCRIPT)
+        self._disconnect = self.redis.register_script(_DISCONNECT_SCRIPT)
+        self._typing = self.redis.register_script(_TYPING_SCRIPT)
+
+    async def online(self, user_ids: Iterable[str]) -> Dict[str, bool]:
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        values = await self.redis.mget([self._user_key(user_id) for user_id in user_ids])
+        return {user_id: value is not None for user_id, value in zip(user_ids, values)}
+
+    async def connected(self, connection: Connection) -> None:
+        user_id = connection.user_id
+        key = self._connections_key(user_id)
+        pipe = self.redis.pipeline()
+        pipe.zadd(key, {connection.id: time.time() + settings.PRESENCE_TTL_SECONDS})
+        pipe.expire(key, settings.PRESENCE_TTL_SECONDS)
+        pipe.set(self._user_key(user_id), 1, ex=settings.PRESENCE_TTL_SECONDS)
+        await pipe.execute()
+
+    async def disconnected(self, connection: Connection) -> None:
+        """Mark the user offline if this was their last connection."""
+        await self._disconnect(
+            keys=[self._connections_key(connection.user_id), self._user_key(connection.user_id)],
+            args=[connection.id, time.time()],
+        )
+
+    async def join(self, connection: Connection, channel: str) -> dict:
+        """Mark the user as in the conversation; returns who is in it and typing."""
+        user_id = connection.user_id
+        members, typing = await self._join(
+            keys=[
+                self._members_key(channel),
+                self._typing_key(channel),
+                self._rate_key(user_id),
+                ConnectionManager.PUBSUB_PREFIX + channel,
+                self._connections_key(user_id, channel),
+            ],
+            args=[
+                user_id,
+                time.time(),
+                settings.PRESENCE_TTL_SECONDS,
+                settings.PRESENCE_UPDATES_PER_MINUTE,
+                self._event("presence", user_id, online=True),
+                connection.id,
+            ],
+        )
+        return {
+            "online": [member.decode() for member in members if member.decode() != user_id],
+            "typing": [member.decode() for member in typing if member.decode() != user_id],
+        }
+
+    async def leave(self, connection: Connection, channels: Iterable[str]) -> None:
+        """Mark the user as gone from conversations they have no other connection to."""
+        user_id = connection.user_id
+        for channel in channels:
+            if channel.partition(":")[0] not in PRESENCE_KINDS:
+                continue
+            await self._leave(
+                keys=[
+                    self._members_key(channel),
+                    self._typing_key(channel),
+                    self._rate_key(user_id),
+                    ConnectionManager.PUBSUB_PREFIX + channel,
+                    self._connections_key(user_id, channel),
+                ],
+                args=[
+                    user_id,
+                    settings.PRESENCE_UPDATES_PER_MINUTE,
+                    self._event("presence", user_id, online=False),
+                    connection.id,
+                    time.time(),
+                ],
+            )
+
+    async def typing(self, user_id: str, channel: str, typing: bool = True) -> bool:
+        """Tell the conversation the user started or stopped typing.
+
+        Returns whether it was sent; repeats within ``TYPING_TTL_SECONDS``
+        and updates over the rate limit are dropped.
+        """
+        sent = await self._typing(
+            keys=[
+                self._typing_key(channel),
+                self._rate_key(user_id),
+                ConnectionManager.PUBSUB_PREFIX + channel,
+            ],
+            args=[
+                user_id,
+                time.time(),
+                settings.TYPING_TTL_SECONDS,
+                settings.PRESENCE_UPDATES_PER_MINUTE,
+                self._event("typing", user_id, typing=typing),
+                1 if typing else 0,
+            ],
+        )
+        return bool(sent)
+
+    async def clear_typing(self, user_id: str, channel: str) -> None:
+        """Stop typing without an event, e.g. when the message itself arrives."""
+        await self.redis.zrem(self._typing_key(channel), user_id)
+
+    async def refresh(self) -> None:
+        expires_at = time.time() + settings.PRESENCE_TTL_SECONDS
+        user_ids = set()
+        # Connection IDs by their connections key, and user IDs by channel
+        connections: Dict[str, List[str]] = {}
+        members: Dict[str, List[str]] = {}
+        for connection in list(self.connections.connections):
+            user_id = connection.user_id
+            if user_id is None:
+                continue
+            user_ids.add(user_id)
+            connections.setdefault(self._connections_key(user_id), []).append(connection.id)
+            for channel in connection.channels:
+                if channel.partition(":")[0] in PRESENCE_KINDS:
+                    members.setdefault(channel, []).append(user_id)
+                    connections.setdefault(
+                        self._connections_key(user_id, channel), []
+                    ).append(connection.id)
+
+        pipe = self.redis.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.set(self._user_key(user_id), 1, ex=settings.PRESENCE_TTL_SECONDS)
+        for key, connection_ids in connections.items():
+            pipe.zadd(key, {connection_id: expires_at for connection_id in connection_ids})
+            pipe.expire(key, settings.PRESENCE_TTL_SECONDS)
+        for channel, channel_user_ids in members.items():
+            key = self._members_key(channel)
+            pipe.zadd(key, {user_id: expires_at for user_id in channel_user_ids})
+            pipe.expire(key, settings.PRESENCE_TTL_SECONDS)
+        await pipe.execute()
+
+    async def run(self) -> None:
+        """Keep this worker's connected users present until cancelled."""
+        while True:
+            await asyncio.sleep(settings.PRESENCE_REFRESH_SECONDS)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Presence refresh failed: {str(e)}", exc_info=True)
+
+    def _event(self, event: str, user_id: str, **state) -> str:
+        return event_message(
+            user_id,
+            json.dumps({"event": event, "user_id": user_id, **state}, separators=(",", ":")),
+        )
+
+    def _user_key(self, user_id: str) -> str:
+        return f"presence:{user_id}"
+
+    def _connections_key(self, user_id: str, channel: Optional[str] = None) -> str:
+        if channel is None:
+            return f"presence:connections:{user_id}"
+        return f"presence:connections:{user_id}:{channel}"
+
+    def _members_key(self, channel: str) -> str:
+        return f"presence:channel:{channel}"
+
+    def _typing_key(self, channel: str) -> str:
+        return f"typing:{channel}"
+
+    def _rate_key(self, user_id: str) -> str:
+        return f"presence:rate:{user_id}"
@@ -0,0 +1,131 @@
+import hashlib
+from datetime import datetime, timedelta
+from typing import Iterable, List
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_client import redis_client, redis_binary_client
+from app.models.swipe import Swipe
+
+# SETBIT only on an existing filter; a missing filter is rebuilt from the
+# swipes table on next load, so partially populating it would lose swipes.
+# Swipes committed while a rebuild runs are re-applied by the rebuild.
+_REBUILD_OVERLAP = timedelta(minutes=1)
+_ADD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 1, #ARGV do
+    redis.call('SETBIT', KEYS[1], ARGV[i], 1)
+end
+return 1
+"""
+
+
+class SwipedSet:
+    """In-memory view of a user's Bloom filter.
+
+    Membership can return false positives (a profile never swiped on is
+    treated as seen) at roughly the configured rate, but never false negatives.
+    """
+
+    def __init__(self, bits: bytes, positions):
+        self.bits = bits
+        self._positions = positions
+
+    def __contains__(self, user_id: str) -> bool:
+        bits = self.bits
+        for position in self._positions(user_id):
+            byte = position >> 3
+            if byte >= len(bits) or not bits[byte] & (0x80 >> (position & 7)):
+                return False
+        return True
+
+
+class SwipeBloomFilter:
+    """Per-user Bloom filter of swiped user IDs stored as a Redis bitmap."""
+
+    def __init__(self, client=redis_client, binary_client=redis_binary_client):
+        self.redis = client
+        self.binary_redis = binary_client
+        self.size_bits = settings.SWIPE_BLOOM_BITS
+        self.hash_count = settings.SWIPE_BLOOM_HASHES
+        self._add_script = self.redis.register_script(_ADD_SCRIPT)
+
+    def add(self, user_id: str, swiped_id: str) -> None:
+        self.add_many(user_id, [swiped_id])
+
+    def add_many(self, user_id: str, swiped_ids: Iterable[str]) -> None:
+        positions = [p for swiped_id in swiped_ids for p in self._positions(swiped_id)]
+        if positions:
+            self._add_script(keys=[self._key(user_id)], args=positions)
+
+    def contains(self, db: Session, user_id: str, swiped_id: str) -> bool:
+        """Whether the user may have swiped on ``swiped_id``; False is certain.
+
+        Reads only the k bits involved rather than the whole filter.
+        """
+        key = self._key(user_id)
+        positions = self._positions(swiped_id)
+        pipe = self.binary_redis.pipeline(transaction=False)
+        pipe.exists(key)
+        for position in positions:
+            pipe.getbit(key, position)
+        exists, *bits = pipe.execute()
+        if not exists:
+            return swiped_id in self.load(db, user_id)
+        return all(bits)
+
+    def load(self, db: Session, user_id: str) -> SwipedSet:
+        """Fetch the user's filter, rebuilding it from the swipes table if missing.
+
+        Reads don't extend the TTL, so every filter is rebuilt from MySQL at
+        least every ``SWIPE_BLOOM_TTL_SECONDS``.
+        """
+        bits = self.binary_redis.get(self._key(user_id))
+        if bits is None:
+            bits = self.rebuild(db, user_id)
+        return SwipedSet(bits, self._positions)
+
+    def rebuild(self, db: Session, user_id: str) -> bytes:
+        started_at = datetime.utcnow()
+        swiped_ids = db.query(Swipe.swiped_id).filter(Swipe.swiper_id == user_id).all()
+        bits = bytearray(self.size_bits // 8)
+        for (swiped_id,) in swiped_ids:
+            for position in self._positions(swiped_id):
+                bits[position >> 3] |= 0x80 >> (position & 7)
+        bits = bytes(bits)
+
+        key = self._key(user_id)
+        if not self.binary_redis.set(key, bits, ex=settings.SWIPE_BLOOM_TTL_SECONDS, nx=True):
+            # Another rebuild got there first, and adds since then went into it
+            return self.binary_redis.get(key) or bits
+
+        # add_many skipped swipes committed before the filter existed; a
+        # fresh session sees those the snapshot above may have missed
+        recent_db = SessionLocal()
+        try:
+            recent_ids = (
+                recent_db.query(Swipe.swiped_id)
+                .filter(
+                    Swipe.swiper_id == user_id,
+                    Swipe.created_at >= started_at - _REBUILD_OVERLAP,
+                )
+                .all()
+            )
+        finally:
+            recent_db.close()
+        if recent_ids:
+            self.add_many(user_id, [swiped_id for (swiped_id,) in recent_ids])
+            return self.binary_redis.get(key) or bits
+        return bits
+
+    def _positions(self, item: str) -> List[int]:
+        # Double hashing: k positions derived from two 64-bit hashes
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.hash_count)]
+
+    def _key(self, user_id: str) -> str:
+        return f"swipes:bloom:{user_id}"
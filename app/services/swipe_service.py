@@ -0,0 +1,251 @@
+import uuid
+from typing import List, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.models.swipe import Swipe, Match
+from app.models.user import User
+from app.services.swipe_filter import SwipeBloomFilter
+from app.services.match_cache import MatchCache
+from app.services.likes_index import LikesIndex
+from app.services.notification_service import NotificationService
+
+# Namespace for deterministic match IDs
+MATCH_NAMESPACE = uuid.UUID("5b0c3f4e-8d2a-4c61-9a57-3e1f0b6d2c89")
+
+# MySQL error code for "Deadlock found when trying to get lock"
+_DEADLOCK = 1213
+_MAX_ATTEMPTS = 3
+
+# Per-item outcomes of a swipe write
+CREATED = "created"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+
+
+class AlreadySwipedError(Exception):
+    pass
+
+
+class InvalidSwipeError(Exception):
+    """The swiped user doesn't exist or is the swiper."""
+    pass
+
+
+def canonical_pair(user_a: str, user_b: str):
+    """Order a user pair the way matches are stored (user1_id < user2_id)."""
+    return (user_a, user_b) if user_a < user_b else (user_b, user_a)
+
+
+def match_id_for(user_a: str, user_b: str) -> str:
+    """Deterministic match ID, so concurrent match creation converges on one row."""
+    user1_id, user2_id = canonical_pair(user_a, user_b)
+    return str(uuid.uuid5(MATCH_NAMESPACE, f"{user1_id}:{user2_id}"))
+
+
+class SwipeService:
+    def record_swipe(
+        self,
+        db: Session,
+        swiper_id: str,
+        swiped_id: str,
+        is_like: bool,
+    ) -> dict:
+        """Insert a swipe and create the match if it completes a mutual like."""
+        swipe = new_swipe(swiper_id, swiped_id, is_like)
+        (result,) = self.persist_swipes(db, [swipe])
+        if result["status"] == INVALID:
+            raise InvalidSwipeError()
+        if result["status"] != CREATED:
+            raise AlreadySwipedError()
+
+        return {
+            "swipe": swipe,
+            "is_match": result["is_match"],
+            "match_id": result["match_id"],
+        }
+
+    def record_swipes(
+        self,
+        db: Session,
+        swiper_id: str,
+        swipes: List[Tuple[str, bool]],
+    ) -> List[dict]:
+        """Insert a batch of (swiped_id, is_like) swipes from one user.
+
+        Returns one result per input item, in order. Swipes on unknown users
+        or on yourself are reported as invalid instead of failing the batch.
+        """
+        return self.persist_swipes(
+            db,
+            [new_swipe(swiper_id, swiped_id, is_like) for swiped_id, is_like in swipes],
+        )
+
+    def persist_swipes(self, db: Session, swipes: List[dict]) -> List[dict]:
+        """Store swipe rows (see ``new_swipe``) from any number of users.
+
+        Safe to replay: a swipe whose row already exists with the same ID is
+        reported as created again without writing anything.
+        """
+        user_ids = {swipe["swiped_id"] for swipe in swipes}
+        existing_users = {
+            row.id for row in db.query(User.id).filter(User.id.in_(user_ids)).all()
+        }
+
+        rows = []
+        results = []
+        for swipe in swipes:
+            if swipe["swiped_id"] == swipe["swiper_id"] or swipe["swiped_id"] not in existing_users:
+                results.append(_result(swipe, INVALID))
+                continue
+            rows.append(swipe)
+            results.append(None)
+
+        persisted = iter(self._persist_with_retry(db, rows) if rows else [])
+        results = [result or next(persisted) for result in results]
+
+        self._after_commit(db, [result for result in results if result["status"] == CREATED])
+        return results
+
+    def _persist_with_retry(self, db: Session, swipes: List[dict]) -> List[dict]:
+        # The reciprocal lookup is a locking read, so two simultaneous mutual
+        # likes serialize on each other's rows instead of both missing the
+        # match. If InnoDB resolves that as a deadlock, the loser is retried.
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                return self._persist(db, swipes)
+            except OperationalError as e:
+                db.rollback()
+                if attempt == _MAX_ATTEMPTS or _error_code(e) != _DEADLOCK:
+                    raise
+
+    def _persist(self, db: Session, swipes: List[dict]) -> List[dict]:
+        """Write swipes and resulting matches in one short transaction.
+
+        Set-based: one multi-row upsert for the swipes, one locking read for
+        both our rows and the reciprocal likes, and one multi-row upsert for
+        the matches.
+        """
+        db.execute(
+            insert(Swipe)
+            .values(swipes)
+            .on_duplicate_key_update(id=Swipe.id)  # Keep existing swipes
+        )
+
+        own_pairs = {(s["swiper_id"], s["swiped_id"]) for s in swipes}
+        reciprocal_pairs = {
+            (s["swiped_id"], s["swiper_id"]) for s in swipes if s["is_like"]
+        }
+        rows = (
+            db.query(Swipe.id, Swipe.swiper_id, Swipe.swiped_id, Swipe.is_like)
+            .filter(
+                tuple_(Swipe.swiper_id, Swipe.swiped_id).in_(own_pairs | reciprocal_pairs)
+            )
+            .with_for_update(read=True)
+            .all()
+        )
+        stored_ids = {(row.swiper_id, row.swiped_id): row.id for row in rows}
+        likes = {(row.swiper_id, row.swiped_id) for row in rows if row.is_like}
+
+        results = []
+        matched_pairs = set()
+        for swipe in swipes:
+            pair = (swipe["swiper_id"], swipe["swiped_id"])
+            if stored_ids.get(pair) != swipe["id"]:
+                results.append(_result(swipe, DUPLICATE))
+                continue
+
+            match_id = None
+            answered = (pair[1], pair[0]) in stored_ids  # They already swiped on us
+            if swipe["is_like"] and (pair[1], pair[0]) in likes:
+                match_pair = canonical_pair(*pair)
+                match_id = match_id_for(*match_pair)
+                matched_pairs.add(match_pair)
+            results.append(_result(swipe, CREATED, match_id, answered))
+
+        if matched_pairs:
+            # Matches created before IDs were deterministic keep their own
+            existing_ids = {
+                (row.user1_id, row.user2_id): row.id
+                for row in db.query(Match.id, Match.user1_id, Match.user2_id)
+                .filter(tuple_(Match.user1_id, Match.user2_id).in_(matched_pairs))
+                .with_for_update(read=True)
+                .all()
+            }
+            new_matches = [
+                {"id": match_id_for(*pair), "user1_id": pair[0], "user2_id": pair[1]}
+                for pair in matched_pairs
+                if pair not in existing_ids
+            ]
+            if new_matches:
+                db.execute(
+                    insert(Match)
+                    .values(new_matches)
+                    .on_duplicate_key_update(id=Match.id)
+                )
+            for result in results:
+                if result["is_match"]:
+                    pair = canonical_pair(result["swiper_id"], result["swiped_id"])
+                    result["match_id"] = existing_ids.get(pair, result["match_id"])
+                    result["match_created"] = pair not in existing_ids
+
+        db.commit()
+        return results
+
+    def _after_commit(self, db: Session, results: List[dict]) -> None:
+        """Side effects of newly stored swipes."""
+        swiped_by_user = {}
+        for result in results:
+            swiped_by_user.setdefault(result["swiper_id"], []).append(result["swiped_id"])
+
+        # Keep the discovery exclusion filters current
+        bloom_filter = SwipeBloomFilter()
+        for swiper_id, swiped_ids in swiped_by_user.items():
+            bloom_filter.add_many(swiper_id, swiped_ids)
+
+        LikesIndex().record(results)
+
+        # New matches change both users' match lists
+        matched_users = [
+            user_id
+            for result in results
+            if result["is_match"]
+            for user_id in (result["swiper_id"], result["swiped_id"])
+        ]
+        if matched_users:
+            MatchCache().invalidate(matched_users)
+
+        # Push the match to both users instead of having them poll for it;
+        # replayed swipes find their match already there and stay quiet
+        created_match_ids = {result["match_id"] for result in results if result["match_created"]}
+        if created_match_ids:
+            NotificationService().notify_matches(db, created_match_ids)
+
+
+def new_swipe(swiper_id: str, swiped_id: str, is_like: bool) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "swiper_id": swiper_id,
+        "swiped_id": swiped_id,
+        "is_like": is_like,
+    }
+
+
+def _result(swipe: dict, status: str, match_id: str = None, answered: bool = False) -> dict:
+    return {
+        "swipe_id": swipe["id"],
+        "swiper_id": swipe["swiper_id"],
+        "swiped_id": swipe["swiped_id"],
+        "is_like": swipe["is_like"],
+        "status": status,
+        "is_match": match_id is not None,
+        "match_id": match_id,
+        "match_created": False,
+        "answered": answered,
+    }
+
+
+def _error_code(error: OperationalError):
+    args = getattr(error.orig, "args", None)
+    return args[0] if args else None
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import List
+from redis.exceptions import ResponseError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.redis_client import redis_client
+from app.models.swipe import Swipe
+from app.models.user import User
+from app.services.likes_index import LikesIndex, likes_received_key
+from app.services.swipe_filter import SwipeBloomFilter
+from app.services.swipe_service import (
+    AlreadySwipedError,
+    InvalidSwipeError,
+    SwipeService,
+    match_id_for,
+    new_swipe,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SwipeStream:
+    """Asynchronous swipe ingestion through a Redis Stream.
+
+    ``enqueue`` appends the swipe and answers immediately; instant matches
+    come from the Redis ``likes:received:{user_id}`` sorted sets. A consumer
+    group persists entries to MySQL in batches and acknowledges them only
+    after commit, so delivery is at-least-once. Entries carry the swipe ID,
+    which makes replays no-ops in ``SwipeService.persist_swipes``. Entries
+    delivered more than ``SWIPE_STREAM_MAX_DELIVERIES`` times are moved to
+    ``swipes:stream:dead`` instead of being retried forever.
+    """
+
+    STREAM_KEY = "swipes:stream"
+    DEAD_LETTER_KEY = "swipes:stream:dead"
+    GROUP = "swipe-persisters"
+
+    def __init__(self, client=redis_client):
+        self.redis = client
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+
+    def enqueue(self, db: Session, swiper_id: str, swiped_id: str, is_like: bool) -> dict:
+        """Validate and queue a swipe, answering as ``record_swipe`` would.
+
+        Raises InvalidSwipeError or AlreadySwipedError.
+        """
+        if swiped_id == swiper_id or not db.query(User.id).filter(User.id == swiped_id).first():
+            raise InvalidSwipeError()
+        # The Bloom filter clears most swipes without MySQL; positives may be false
+        if SwipeBloomFilter().contains(db, swiper_id, swiped_id) and (
+            db.query(Swipe.id)
+            .filter(Swipe.swiper_id == swiper_id, Swipe.swiped_id == swiped_id)
+            .first()
+        ):
+            raise AlreadySwipedError()
+        # Likes that only MySQL knows about must count for instant matches
+        LikesIndex().ensure_built(db, swiper_id)
+        # Swipes still in the stream are in neither MySQL nor the filter yet
+        pending_key = f"swipes:pending:{swiper_id}:{swiped_id}"
+        if not self.redis.set(pending_key, "1", nx=True, ex=settings.SWIPE_STREAM_PENDING_TTL_SECONDS):
+            raise AlreadySwipedError()
+
+        swipe = new_swipe(swiper_id, swiped_id, is_like)
+        pipe = self.redis.pipeline(transaction=True)
+        # Did they already like us? Swiping back answers that like either way.
+        pipe.zscore(likes_received_key(swiper_id), swiped_id)
+        pipe.zrem(likes_received_key(swiper_id), swiped_id)
+        if is_like:
+            pipe.zadd(likes_received_key(swiped_id), {swiper_id: time.time()}, nx=True)
+        pipe.xadd(
+            self.STREAM_KEY,
+            {
+                "id": swipe["id"],
+                "swiper_id": swiper_id,
+                "swiped_id": swiped_id,
+                "is_like": "1" if is_like else "0",
+            },
+            maxlen=settings.SWIPE_STREAM_MAXLEN,
+            approximate=True,
+        )
+        try:
+            replies = pipe.execute()
+        except Exception:
+            self.redis.delete(pending_key)
+            raise
+
+        is_match = is_like and replies[0] is not None
+        return {
+            "swipe": swipe,
+            "is_match": is_match,
+            "match_id": match_id_for(swiper_id, swiped_id) if is_match else None,
+        }
+
+    def consume_batch(self) -> int:
+        """Persist one batch of stream entries. Returns the number processed."""
+        self._ensure_group()
+
+        # Entries that failed or were left pending by consumers that died
+        # take priority
+        _, claimed, *_ = self.redis.xautoclaim(
+            self.STREAM_KEY,
+            self.GROUP,
+            self.consumer,
+            min_idle_time=settings.SWIPE_STREAM_CLAIM_IDLE_MS,
+            count=settings.SWIPE_STREAM_BATCH_SIZE,
+        )
+        claimed = [entry for entry in claimed if entry[1]]  # Skip trimmed entries
+        if claimed:
+            return self._retry(claimed)
+
+        response = self.redis.xreadgroup(
+            self.GROUP,
+            self.consumer,
+            {self.STREAM_KEY: ">"},
+            count=settings.SWIPE_STREAM_BATCH_SIZE,
+            block=settings.SWIPE_STREAM_BLOCK_MS,
+        )
+        entries = response[0][1] if response else []
+        if not entries:
+            return 0
+
+        self._persist([fields for _, fields in entries])
+        self.redis.xack(self.STREAM_KEY, self.GROUP, *[entry_id for entry_id, _ in entries])
+        return len(entries)
+
+    def _retry(self, entries: List[tuple]) -> int:
+        """Persist reclaimed entries one at a time, so a bad one only holds up itself."""
+        pipe = self.redis.pipeline(transaction=False)
+        for entry_id, _ in entries:
+            pipe.xpending_range(self.STREAM_KEY, self.GROUP, min=entry_id, max=entry_id, count=1)
+        deliveries = [pending[0]["times_delivered"] if pending else 0 for pending in pipe.execute()]
+
+        processed = 0
+        for (entry_id, fields), delivered in zip(entries, deliveries):
+            if delivered > settings.SWIPE_STREAM_MAX_DELIVERIES:
+                logger.error(f"Dead-lettering swipe {fields['id']} after {delivered} deliveries")
+                pipe = self.redis.pipeline(transaction=True)
+                pipe.xadd(
+                    self.DEAD_LETTER_KEY,
+                    {**fields, "entry_id": entry_id},
+                    maxlen=settings.SWIPE_STREAM_MAXLEN,
+                    approximate=True,
+                )
+                pipe.xack(self.STREAM_KEY, self.GROUP, entry_id)
+                pipe.execute()
+                continue
+            try:
+                self._persist([fields])
+            except Exception as e:
+                logger.error(f"Streamed swipe {fields['id']} failed again: {str(e)}")
+                continue
+            self.redis.xack(self.STREAM_KEY, self.GROUP, entry_id)
+            processed += 1
+        return processed
+
+    def _persist(self, entries: List[dict]) -> None:
+        swipes = [
+            {
+                "id": fields["id"],
+                "swiper_id": fields["swiper_id"],
+                "swiped_id": fields["swiped_id"],
+                "is_like": fields["is_like"] == "1",
+            }
+            for fields in entries
+        ]
+        db = SessionLocal()
+        try:
+            SwipeService().persist_swipes(db, swipes)
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        """Consume the stream until cancelled."""
+        while True:
+            try:
+                processed = await asyncio.to_thread(self.consume_batch)
+                if processed:
+                    logger.info(f"Persisted {processed} streamed swipes")
+            except Exception as e:
+                logger.error(f"Swipe stream consumer failed: {str(e)}", exc_info=True)
+                await asyncio.sleep(1)
+
+    def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            self.redis.xgroup_create(self.STREAM_KEY, self.GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
@@ -1,44 +1,357 @@
-from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List
+from fastapi import WebSocket, WebSocketDisconnect, WebSocketException, status
+from typing import Dict, List, Optional, Set, Union
+import asyncio
 import json
+import logging
+import struct
+import time
+import uuid
+import msgpack
+from app.core.config import settings
+from app.core.redis_client import redis_async_client
+
+logger = logging.getLogger(__name__)
+
+# What happens when a connection's outbound queue is full
+DROP_MESSAGES = "drop"
+DISCONNECT = "disconnect"
+
+# Opt-in subprotocols: outbound messages are batched into one frame per tick,
+# as a JSON array (text frame) or a MessagePack array (binary frame). Clients
+# that don't ask for one get one JSON text frame per message.
+JSON_BATCH = "xoxo.batch.json"
+MSGPACK_BATCH = "xoxo.batch.msgpack"
+SUBPROTOCOLS = (MSGPACK_BATCH, JSON_BATCH)  # In order of preference
+
+# Application-level heartbeat: a bare "ping" text frame is answered with
+# "pong" and only keeps the connection from being reaped as idle
+PING = "ping"
+PONG = "pong"
+
+# Channels are "{kind}:{id}": match:, room: and nearby: conversations, and
+# user:{user_id} for events addressed to one user. Per-conversation sockets
+# receive bare messages; multiplexed sockets get them tagged with the channel.
+USER_CHANNEL = "user"
+
+# Conversation events (presence, typing) are published as
+# "{marker}{user_id}{marker}{event}", which is stripped on delivery; they
+# only reach multiplexed sockets, and not those of the user they are about.
+# Messages are JSON objects, so they never start with the marker.
+EVENT_MARKER = "\x1e"
+
+
+def channel_name(kind: str, id: str) -> str:
+    return f"{kind}:{id}"
+
+
+def event_message(user_id: str, event: str) -> str:
+    return f"{EVENT_MARKER}{user_id}{EVENT_MARKER}{event}"
+
+
+def negotiate_subprotocol(websocket: WebSocket) -> Optional[str]:
+    requested = websocket.scope.get("subprotocols") or []
+    for subprotocol in SUBPROTOCOLS:
+        if subprotocol in requested:
+            return subprotocol
+    return None
+
+
+async def receive_frame(websocket: WebSocket) -> Union[str, bytes]:
+    """The next text or binary frame."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+    if message.get("text") is not None:
+        return message["text"]
+    return message["bytes"]
+
+
+class Outbound:
+    """A message being delivered, encoded at most once per format."""
+
+    __slots__ = ("channel", "text", "_packed", "_tagged_text", "_tagged_packed")
+
+    def __init__(self, channel: str, text: str):
+        self.channel = channel
+        self.text = text
+        self._packed = None
+        self._tagged_text = None
+        self._tagged_packed = None
+
+    @property
+    def packed(self) -> bytes:
+        if self._packed is None:
+            self._packed = msgpack.packb(json.loads(self.text))
+        return self._packed
+
+    @property
+    def tagged_text(self) -> str:
+        if self._tagged_text is None:
+            self._tagged_text = f'{{"channel":{json.dumps(self.channel)},"data":{self.text}}}'
+        return self._tagged_text
+
+    @property
+    def tagged_packed(self) -> bytes:
+        if self._tagged_packed is None:
+            # A two-entry map, reusing the packed payload
+            self._tagged_packed = (
+                b"\x82"
+                + msgpack.packb("channel")
+                + msgpack.packb(self.channel)
+                + msgpack.packb("data")
+                + self.packed
+            )
+        return self._tagged_packed
+
+
+def _msgpack_array_header(length: int) -> bytes:
+    if length < 16:
+        return bytes([0x90 | length])
+    if length < 2 ** 16:
+        return b"\xdc" + struct.pack(">H", length)
+    return b"\xdd" + struct.pack(">I", length)
+
+
+class Connection:
+    """A socket with its own bounded outbound queue and writer task.
+
+    Senders only enqueue, so a slow or dead client delays nobody else.
+    ``tagged`` connections are multiplexed and get every message wrapped as
+    ``{"channel": ..., "data": ...}``.
+    """
+
+    # Slotted: a node holds 100k+ of these
+    __slots__ = (
+        "id",
+        "websocket",
+        "subprotocol",
+        "tagged",
+        "user_id",
+        "channels",
+        "queue",
+        "writer",
+        "last_seen",
+    )
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        subprotocol: Optional[str] = None,
+        tagged: bool = False,
+        user_id: Optional[str] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.subprotocol = subprotocol
+        self.tagged = tagged
+        self.user_id = user_id
+        self.channels: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self.writer = asyncio.create_task(self._write())
+        self.last_seen = time.monotonic()
+
+    def send(self, message: Union[Outbound, str]) -> None:
+        """Queue an ``Outbound`` message, or a control frame as a plain string."""
+        if self.writer.done():
+            return  # Closed; waiting for the receive loop to clean up
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            if settings.WS_SLOW_CONSUMER_POLICY == DISCONNECT:
+                self.writer.cancel()
+                asyncio.create_task(self._close(status.WS_1013_TRY_AGAIN_LATER))
+
+    def stop(self) -> None:
+        self.writer.cancel()
+
+    async def _write(self) -> None:
+        while True:
+            item = await self.queue.get()
+            messages = []
+            control = None
+            if isinstance(item, str):
+                control = item
+            else:
+                messages.append(item)
+                if self.subprotocol is not None:
+                    # Coalesce a burst arriving within one tick into one frame;
+                    # a lone message on a quiet connection goes out at once
+                    if not self.queue.empty():
+                        await asyncio.sleep(settings.WS_BATCH_INTERVAL_MS / 1000)
+                    while len(messages) < settings.WS_BATCH_MAX_MESSAGES and not self.queue.empty():
+                        item = self.queue.get_nowait()
+                        if isinstance(item, str):
+                            control = item  # Sent on its own, after the batch
+                            break
+                        messages.append(item)
+            try:
+                if messages:
+                    await self._send_frame(messages)
+                if control is not None:
+                    await self.websocket.send_text(control)
+            except Exception:
+                # Gone without a clean close; the receive loop will clean up
+                await self._close(status.WS_1011_INTERNAL_ERROR)
+                return
+
+    async def _send_frame(self, messages: List[Outbound]) -> None:
+        if self.subprotocol == MSGPACK_BATCH:
+            await self.websocket.send_bytes(
+                _msgpack_array_header(len(messages))
+                + b"".join(
+                    message.tagged_packed if self.tagged else message.packed
+                    for message in messages
+                )
+            )
+        elif self.subprotocol == JSON_BATCH:
+            await self.websocket.send_text(
+                "["
+                + ",".join(
+                    message.tagged_text if self.tagged else message.text
+                    for message in messages
+                )
+                + "]"
+            )
+        else:
+            message = messages[0]
+            await self.websocket.send_text(message.tagged_text if self.tagged else message.text)
+
+    async def _close(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
 
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    """This worker's websocket connections, fanned out to via Redis ``ws:{channel}``."""
 
-    async def connect(self, websocket: WebSocket, room_id: str):
-        await websocket.accept()
-        if room_id not in self.active_connections:
-            self.active_connections[room_id] = []
-        self.active_connections[room_id].append(websocket)
+    PUBSUB_PREFIX = "ws:"
 
-    def disconnect(self, websocket: WebSocket, room_id: str):
-        if room_id in self.active_connections:
-            self.active_connections[room_id].remove(websocket)
-            if not self.active_connections[room_id]:
-                del self.active_connections[room_id]
+    def __init__(self, client=redis_async_client):
+        self.connections: Set[Connection] = set()
+        self.subscriptions: Dict[str, Set[Connection]] = {}
+        self.redis = client
+        self._pubsub = None
+        self._has_subscribed = asyncio.Event()
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+    async def accept(
+        self,
+        websocket: WebSocket,
+        subprotocol: Optional[str] = None,
+        tagged: bool = False,
+        user_id: Optional[str] = None,
+    ) -> Connection:
+        if len(self.connections) >= settings.WS_MAX_CONNECTIONS:
+            raise WebSocketException(
+                code=status.WS_1013_TRY_AGAIN_LATER,
+                reason="Too many connections",
+            )
+        await websocket.accept(subprotocol=subprotocol)
+        connection = Connection(websocket, subprotocol, tagged, user_id)
+        self.connections.add(connection)
+        return connection
 
-    async def broadcast(self, message: str, room_id: str):
-        if room_id in self.active_connections:
-            for connection in self.active_connections[room_id]:
-                await connection.send_text(message)
+    async def connect(
+        self,
+        websocket: WebSocket,
+        channel: str,
+        subprotocol: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> Connection:
+        """Accept a socket that follows a single channel."""
+        connection = await self.accept(websocket, subprotocol, user_id=user_id)
+        await self.subscribe(connection, channel)
+        return connection
 
+    async def subscribe(self, connection: Connection, channel: str):
+        if channel in connection.channels:
+            return
+        connection.channels.add(channel)
+        if channel not in self.subscriptions:
+            self.subscriptions[channel] = set()
+            await self._get_pubsub().subscribe(self.PUBSUB_PREFIX + channel)
+            self._has_subscribed.set()
+        self.subscriptions[channel].add(connection)
 
-manager = ConnectionManager()
+    async def unsubscribe(self, connection: Connection, channel: str):
+        connection.channels.discard(channel)
+        subscribers = self.subscriptions.get(channel)
+        if subscribers is None:
+            return
+        subscribers.discard(connection)
+        if not subscribers:
+            del self.subscriptions[channel]
+            await self._get_pubsub().unsubscribe(self.PUBSUB_PREFIX + channel)
+
+    async def disconnect(self, connection: Connection):
+        """Forget a connection; safe to call more than once."""
+        connection.stop()
+        self.connections.discard(connection)
+        for channel in list(connection.channels):
+            await self.unsubscribe(connection, channel)
+
+    async def receive(self, connection: Connection) -> Union[str, bytes]:
+        """The connection's next frame, answering heartbeats along the way."""
+        while True:
+            frame = await receive_frame(connection.websocket)
+            connection.last_seen = time.monotonic()
+            if frame != PING:
+                return frame
+            connection.send(PONG)
+
+    async def send_personal_message(self, message: str, connection: Connection, channel: str = ""):
+        connection.send(Outbound(channel, message))
+
+    async def broadcast(self, message: str, channel: str):
+        await self.redis.publish(self.PUBSUB_PREFIX + channel, message)
 
+    def deliver(self, message: str, channel: str):
+        """Queue a message for this worker's subscribers of the channel."""
+        about = None
+        if message.startswith(EVENT_MARKER):
+            _, about, message = message.split(EVENT_MARKER, 2)
+        outbound = Outbound(channel, message)
+        for connection in self.subscriptions.get(channel, ()):
+            if about is None or (connection.tagged and connection.user_id != about):
+                connection.send(outbound)
 
-async def websocket_endpoint(websocket: WebSocket, room_id: str):
-    await manager.connect(websocket, room_id)
-    try:
+    async def run(self) -> None:
+        """Deliver messages published by any worker until cancelled."""
+        await self._has_subscribed.wait()
+        pubsub = self._get_pubsub()
         while True:
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
-            # Broadcast to all connections in the room
-            await manager.broadcast(json.dumps(message_data), room_id)
-    except WebSocketDisconnect:
-        manager.disconnect(websocket, room_id)
+            try:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                channel = message["channel"].decode()[len(self.PUBSUB_PREFIX):]
+                self.deliver(message["data"].decode(), channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Websocket fan-out failed: {str(e)}", exc_info=True)
+                await asyncio.sleep(1)
 
+    async def reap(self) -> None:
+        """Close idle connections until cancelled."""
+        while True:
+            await asyncio.sleep(settings.WS_PING_INTERVAL_SECONDS)
+            cutoff = time.monotonic() - settings.WS_IDLE_TIMEOUT_SECONDS
+            idle = [connection for connection in self.connections if connection.last_seen < cutoff]
+            for connection in idle:
+                try:
+                    await self.disconnect(connection)
+                    await connection._close(status.WS_1001_GOING_AWAY)
+                except Exception as e:
+                    logger.error(f"Failed to close idle websocket: {str(e)}", exc_info=True)
+            if idle:
+                logger.info(f"Closed {len(idle)} idle websockets")
+
+    def _get_pubsub(self):
+        if self._pubsub is None:
+            self._pubsub = self.redis.pubsub()
+        return self._pubsub
+
+
+manager = ConnectionManager()
@@ -4,6 +4,14 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.services.location_buffer import LocationBuffer
+from app.services.discovery_service import DiscoveryService
+from app.services.candidate_store import candidate_store
+from app.services.swipe_stream import SwipeStream
+from app.services.message_writer import message_writer
+from app.services.presence_service import PresenceService
+from app.websocket.chat_websocket import manager
+import asyncio
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -45,6 +53,50 @@ async def general_exception_handler(request: Request, exc: Exception):
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
+location_buffer = LocationBuffer()
+discovery_service = DiscoveryService()
+swipe_stream = SwipeStream()
+presence_service = PresenceService()
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    app.state.background_tasks = [
+        asyncio.create_task(location_buffer.run()),
+        asyncio.create_task(discovery_service.run()),
+        asyncio.create_task(candidate_store.run()),
+        asyncio.create_task(manager.run()),
+        asyncio.create_task(manager.reap()),
+        asyncio.create_task(presence_service.run()),
+    ]
+    if settings.SWIPE_INGEST_MODE == "stream":
+        app.state.background_tasks.append(asyncio.create_task(swipe_stream.run()))
+    app.state.message_writer_task = asyncio.create_task(message_writer.run())
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    # Let the message writer drain its queue, but not forever if MySQL is down
+    await message_writer.close()
+    try:
+        await asyncio.wait_for(
+            app.state.message_writer_task,
+            timeout=settings.CHAT_WRITE_SHUTDOWN_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        dropped = message_writer.discard()
+        logger.error(f"Message writer did not drain in time; {dropped} messages were not persisted")
+    
+    for task in app.state.background_tasks:
+        task.cancel()
+    await asyncio.gather(*app.state.background_tasks, return_exceptions=True)
+    
+    # Don't leave buffered writes behind
+    try:
+        await asyncio.to_thread(location_buffer.flush)
+    except Exception as e:
+        logger.error(f"Final location flush failed: {str(e)}", exc_info=True)
+
 
 @app.get("/")
 async def root():
@@ -1,15 +1,19 @@
 #!/usr/bin/env python3
 """
-Development server runner
+Server runner, used by the Docker image; pass --reload for development
 """
+import sys
 import uvicorn
+from app.core.config import settings
 
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload="--reload" in sys.argv[1:],
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE,
+        ws_ping_interval=settings.WS_PING_INTERVAL_SECONDS,
+        ws_ping_timeout=settings.WS_PING_TIMEOUT_SECONDS,
         log_level="info"
     )
-